@@ -0,0 +1,98 @@
+"""
+Export aggregation on a year of data: aggregate_with_attributes against the functions it replaced.
+
+The legacy path is group_and_sum_without_remove_columns and its '2' variant as they were
+before aggregate_with_attributes: 'first' on every column and pd.to_numeric on every call.
+Both paths build the 'Total' (pv, posicion) and 'Resumen' (pv) tables of the Progreso rows
+of generate_items' default 365-day span; the sums, costs and attributes must match:
+
+    python benchmarks/export_aggregation.py
+    python benchmarks/export_aggregation.py --items 100000
+"""
+import argparse
+import os
+import sys
+import timeit
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exports import _RESUMEN_ATTRIBUTES, _TOTAL_ATTRIBUTES
+from fixed_point import perforated_mm
+from pricing import add_cost
+from synthetic import make_items
+from util_functions import aggregate_with_attributes, create_dataframe_from_items
+
+
+def legacy_group_and_sum(df, group_columns, avg_columns, add_mm=False,
+                         cols_to_convert=('cantidadPerforacionesPlacas', 'kg', 'placas', 'espesor', 'perforaTotal')):
+    df = df.copy()
+    cols_to_convert = [col for col in cols_to_convert if col in df.columns]
+    df[cols_to_convert] = df[cols_to_convert].apply(pd.to_numeric, errors='ignore')
+    agg_dict = {col: 'first' for col in df.columns}
+    for col in avg_columns:
+        agg_dict[col] = 'sum'
+    grouped_df = df.groupby(group_columns, as_index=False, observed=True).agg(agg_dict)
+    for col in avg_columns:
+        grouped_df[col] = grouped_df[col].round(2)
+    if add_mm:
+        grouped_df['mm de perforado'] = grouped_df['perforaTotal'] * grouped_df['espesor']
+        add_cost(grouped_df)
+    return grouped_df.reset_index(drop=True)
+
+
+def legacy_exports(progress):
+    dropped = ['Inicio', 'progress_createdAt', 'origen', 'maquina', 'tiempo', 'tiempo_seteo', 'hora_reporte',
+               'Tiempo Proceso (min)']
+    total = legacy_group_and_sum(progress.drop(columns=dropped), ['pv', 'posicion'], ['perforaTotal', 'placas'],
+                                 add_mm=True)
+    resumen = legacy_group_and_sum(total, ['pv'], ['perforaTotal', 'mm de perforado', 'costo'])
+    return resumen, total
+
+
+def current_exports(progress):
+    total = aggregate_with_attributes(progress, ['pv', 'posicion'], ['perforaTotal', 'placas'], _TOTAL_ATTRIBUTES)
+    total['mm de perforado'] = perforated_mm(total['perforaTotal'], total['espesor'])
+    add_cost(total)
+    resumen = aggregate_with_attributes(total, ['pv'], ['perforaTotal', 'mm de perforado', 'costo'],
+                                        _RESUMEN_ATTRIBUTES)
+    return resumen, total
+
+
+def assert_same(legacy, current, columns):
+    for col in columns:
+        left, right = legacy[col], current[col]
+        if pd.api.types.is_float_dtype(right):
+            # The legacy mm were float products, the current ones are rounded from micrometres
+            np.testing.assert_allclose(left.to_numpy(dtype=float), right.to_numpy(dtype=float), rtol=1e-9)
+        else:
+            assert left.astype(object).tolist() == right.astype(object).tolist(), col
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore', FutureWarning)
+    pd.set_option('mode.copy_on_write', True)
+
+    df = create_dataframe_from_items(make_items(args.items))
+    progress = df[df['origen'] == 'Progreso'].reset_index(drop=True)
+
+    legacy_resumen, legacy_total = legacy_exports(progress)
+    resumen, total = current_exports(progress)
+    assert_same(legacy_total, total, list(total.columns))
+    assert_same(legacy_resumen, resumen, list(resumen.columns))
+    print(f"{len(progress)} Progreso rows, {len(total)} pv/posicion groups, {len(resumen)} pv: outputs match")
+
+    for name, func in [('legacy', legacy_exports), ('aggregate_with_attributes', current_exports)]:
+        best = min(timeit.repeat(lambda: func(progress), number=1, repeat=args.repeat))
+        print(f"{name:<28} {1000 * best:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
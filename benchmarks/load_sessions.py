@@ -0,0 +1,104 @@
+"""
+Load check of the shared dataset: opens many simulated sessions of main.py in one process.
+
+Every session is a streamlit AppTest run against a SyntheticTable, alternating between
+two months. The check fails (exit status 1) when the process syncs more than once or
+when RSS grows by more than --max-growth times the size of the shared DataFrame
+once every month has been opened:
+
+    python benchmarks/load_sessions.py
+    python benchmarks/load_sessions.py --sessions 40 --items 200000
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database
+from streamlit.testing.v1 import AppTest
+from synthetic import SyntheticTable, make_items
+
+# Months the sessions alternate between, inside the default span of generate_items
+MONTHS = [(2024, 10), (2025, 3)]
+
+
+def rss_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def patch_database(items):
+    """
+    Points main.py's get_table and sync_snapshot at a SyntheticTable and a temporary snapshot.
+
+    Returns the list that receives the size in bytes of the frame of every sync.
+    """
+    table = SyntheticTable(items)
+    snapshot_dir = tempfile.mkdtemp()
+    sync_snapshot = database.sync_snapshot
+    syncs = []
+
+    def synthetic_sync(_table, snapshot_dir=snapshot_dir, **kwargs):
+        df, meta = sync_snapshot(table, snapshot_dir, table_factory=lambda: table, **kwargs)
+        syncs.append(int(df.memory_usage(deep=True).sum()))
+        return df, meta
+
+    database.get_table = lambda *args, **kwargs: table
+    database.sync_snapshot = synthetic_sync
+    return syncs
+
+
+def open_session(year, month):
+    session = AppTest.from_file(os.path.join(ROOT, 'main.py'), default_timeout=600)
+    session.run()
+    session.selectbox(key='month_selector').set_value(month)
+    session.selectbox(key='year_selector').set_value(year)
+    session.run()
+    if session.exception:
+        raise RuntimeError(session.exception)
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--max-growth', type=float, default=2.0,
+                        help="Allowed RSS growth, in sizes of the shared DataFrame")
+    args = parser.parse_args()
+    warnings.simplefilter('ignore', FutureWarning)
+
+    # main.py reads data/logo.png relative to the working directory
+    os.chdir(ROOT)
+    syncs = patch_database(make_items(args.items))
+    sessions = []
+    for i in range(args.sessions):
+        sessions.append(open_session(*MONTHS[i % len(MONTHS)]))
+        gc.collect()
+        # Growth is measured once every month has been opened and its views cached
+        if i == len(MONTHS) - 1:
+            first_rss = rss_bytes()
+        print(f"sessions {i + 1:3d}   rss {rss_bytes() / 2 ** 20:8.1f} MB   syncs {len(syncs)}", flush=True)
+
+    frame_bytes = syncs[-1]
+    growth = rss_bytes() - first_rss
+    print(f"shared frame {frame_bytes / 2 ** 20:.1f} MB, RSS growth {growth / 2 ** 20:.1f} MB "
+          f"over {args.sessions - len(MONTHS)} sessions")
+
+    failures = []
+    if len(syncs) != 1:
+        failures.append(f"{len(syncs)} syncs instead of 1")
+    if growth > args.max_growth * frame_bytes:
+        failures.append(f"RSS grew by more than {args.max_growth} shared frames")
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Month selection cost as the history grows.
+
+Builds histories of 12 to 96 months with the same number of items per month and times
+get_month_splits for the busiest month, per 1000 rows of that month. Selecting a month
+reads positions from build_month_index, so its cost should follow the month's size and
+not the history's. Every call also pays a fixed cost (the @timed wrapper and the empty
+takes), shown as the time to select a month without rows. Exits 1 when a history's cost
+per 1000 rows is more than --max-growth times that of the shortest history:
+
+    python benchmarks/month_split_sweep.py
+    python benchmarks/month_split_sweep.py --months 12 48 --items-per-month 5000
+"""
+import argparse
+import os
+import sys
+import timeit
+import warnings
+from itertools import count, islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import ingest_pages
+from synthetic import generate_items
+from util_functions import build_month_index, get_month_splits
+
+
+def pages(items, page_size=1000):
+    iterator = iter(items)
+    for number in count():
+        page = list(islice(iterator, page_size))
+        if not page:
+            return
+        yield (0, number), page
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--months', type=int, nargs='+', default=[12, 24, 48, 96])
+    parser.add_argument('--items-per-month', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--number', type=int, default=10, help="Calls per timed repeat")
+    parser.add_argument('--max-growth', type=float, default=2.0)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore', FutureWarning)
+
+    failures = []
+    base_per_1k = None
+    for months in sorted(args.months):
+        items = generate_items(months * args.items_per_month, days=months * 30)
+        df = ingest_pages(pages(items))
+        month_index = build_month_index(df)
+        index_seconds = min(timeit.repeat(lambda: build_month_index(df), number=1, repeat=3))
+        year, month = max(month_index, key=lambda key: len(month_index[key]['all']))
+        month_rows = len(month_index[(year, month)]['all'])
+        seconds = min(timeit.repeat(lambda: get_month_splits(df, month_index, year, month),
+                                    number=args.number, repeat=args.repeat)) / args.number
+        empty_seconds = min(timeit.repeat(lambda: get_month_splits(df, month_index, 0, 1),
+                                          number=args.number, repeat=args.repeat)) / args.number
+        per_1k = 1000 * seconds / (month_rows / 1000)
+        if base_per_1k is None:
+            base_per_1k = per_1k
+        growth = per_1k / base_per_1k
+        print(f"{months:3d} months {len(df):>8} rows   build_month_index {1000 * index_seconds:7.1f} ms   "
+              f"get_month_splits {1000 * seconds:6.2f} ms for {month_rows} rows "
+              f"(no rows {1000 * empty_seconds:5.2f} ms) = {per_1k:.3f} ms per 1k rows, x {growth:.2f}",
+              flush=True)
+        if growth > args.max_growth:
+            failures.append(months)
+
+    if failures:
+        print(f"More than x {args.max_growth} the cost per 1k rows of {min(args.months)} months "
+              f"with {failures} months of history")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+"""
+Offline benchmarks of the data functions and of the month page computation.
+
+Runs every benchmark on synthetic items (see synthetic.py), prints the timings and
+compares them with a stored baseline:
+
+    python benchmarks/run.py                 # compare with benchmarks/baseline.json
+    python benchmarks/run.py --save          # store the current timings as the baseline
+    python benchmarks/run.py --items 400000 --only ingest_pages
+
+A benchmark regresses when its best time is more than --tolerance slower than the baseline
+and at least --min-delta-ms slower in absolute terms. The exit status is 1 when any
+benchmark regresses. Baselines are only comparable on the same machine and item count.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+from datetime import datetime
+from itertools import count, islice
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rollup
+from dashboard_model import DashboardModel
+from synthetic import SyntheticTable, generate_items, make_items
+from util_functions import (add_months, aggregate_with_attributes, apply_schema, build_month_index,
+                            calculate_max_average, comparison_bar_plot, concat_frames, create_dataframe_from_items,
+                            create_perfora_grid, expand_datetime_column, filter_and_drop_columns,
+                            filter_rows_by_column_value, format_perfora_grid, get_month_splits,
+                            get_months_and_years_since, group_and_average, group_and_avg, group_and_sum, sunburst_plot)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Items flattened by the create_dataframe_from_items benchmark, which needs them in memory
+SAMPLE_ITEMS = 20000
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Registers setup(ctx) -> callable under name; the returned callable is what gets timed."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _pages(items, page_size=1000):
+    # (key, items) pairs like iter_parallel_scan_pages yields, without a table
+    iterator = iter(items)
+    for number in count():
+        page = list(islice(iterator, page_size))
+        if not page:
+            return
+        yield (0, number), page
+
+
+def build_context(n_items, seed):
+    """Builds the dataset every benchmark reads, streaming the items so n_items can be large."""
+    from database import ingest_pages
+
+    df = ingest_pages(_pages(generate_items(n_items, seed=seed)))
+    month_index = build_month_index(df)
+    data_rollup = rollup.build_rollup(df)
+    # The busiest month is the one the page benchmarks render
+    year, month = max(month_index, key=lambda key: len(month_index[key]['all']))
+    month_df = get_month_splits(df, month_index, year, month)['all']
+    progress = month_df[month_df['origen'] == 'Progreso']
+    return {
+        'n_items': n_items,
+        'seed': seed,
+        'df': df,
+        'month_index': month_index,
+        'rollup': data_rollup,
+        'year': year,
+        'month': month,
+        'month_df': month_df,
+        'stats': calculate_max_average(progress),
+    }
+
+
+# --- util_functions ---
+
+@benchmark('get_months_and_years_since')
+def _(ctx):
+    return lambda: get_months_and_years_since("01/10/2024")
+
+
+@benchmark('add_months')
+def _(ctx):
+    return lambda: [add_months(datetime(2024, 1, 15), months) for months in range(120)]
+
+
+@benchmark('build_month_index')
+def _(ctx):
+    return lambda: build_month_index(ctx['df'])
+
+
+@benchmark('get_month_splits')
+def _(ctx):
+    return lambda: get_month_splits(ctx['df'], ctx['month_index'], ctx['year'], ctx['month'])
+
+
+@benchmark('apply_schema')
+def _(ctx):
+    return lambda: apply_schema(ctx['df'].astype({'pv': object, 'maquina': object}))
+
+
+@benchmark('create_dataframe_from_items')
+def _(ctx):
+    items = make_items(min(ctx['n_items'], SAMPLE_ITEMS), seed=ctx['seed'])
+    return lambda: create_dataframe_from_items(items)
+
+
+@benchmark('concat_frames')
+def _(ctx):
+    half = len(ctx['df']) // 2
+    frames = [ctx['df'].iloc[:half], ctx['df'].iloc[half:]]
+    return lambda: concat_frames(frames)
+
+
+@benchmark('filter_and_drop_columns')
+def _(ctx):
+    return lambda: filter_and_drop_columns(ctx['month_df'], 'origen', 'Seteo', ['hora_reporte', 'tiempo_seteo'])
+
+
+@benchmark('group_and_average')
+def _(ctx):
+    return lambda: group_and_average(ctx['month_df'], ['maquina', 'tipoMecanizado'], 'perforaTotal')
+
+
+@benchmark('aggregate_with_attributes')
+def _(ctx):
+    return lambda: aggregate_with_attributes(ctx['month_df'], ['pv', 'posicion'], ['perforaTotal'],
+                                             ['Terminado', 'espesor', 'negocio', 'cliente'])
+
+
+@benchmark('group_and_sum')
+def _(ctx):
+    return lambda: group_and_sum(ctx['month_df'], ['pv', 'espesor'], 'placas')
+
+
+@benchmark('group_and_avg')
+def _(ctx):
+    return lambda: group_and_avg(ctx['month_df'], ['tipoMecanizado', 'espesor'], 'perforaTotal')
+
+
+@benchmark('sunburst_plot')
+def _(ctx):
+    return lambda: sunburst_plot(ctx['month_df'], ['maquina', 'tipoMecanizado'], 'CNC', 'perforaTotal')
+
+
+@benchmark('comparison_bar_plot')
+def _(ctx):
+    periods = rollup.last_months(ctx['year'], ctx['month'], 6)
+    machines = rollup.monthly_machine_metrics(ctx['rollup'], periods)
+    return lambda: comparison_bar_plot(machines, 'total_mm', 'maquina', 'Total mm por maquina')
+
+
+@benchmark('filter_rows_by_column_value')
+def _(ctx):
+    return lambda: filter_rows_by_column_value(ctx['df'], 'origen', 'Progreso')
+
+
+@benchmark('expand_datetime_column')
+def _(ctx):
+    return lambda: expand_datetime_column(ctx['month_df'].copy(deep=False), 'Terminado')
+
+
+@benchmark('calculate_max_average')
+def _(ctx):
+    progress = ctx['df'][ctx['df']['origen'] == 'Progreso']
+    return lambda: calculate_max_average(progress)
+
+
+@benchmark('create_perfora_grid')
+def _(ctx):
+    return lambda: create_perfora_grid(ctx['stats'])
+
+
+@benchmark('format_perfora_grid')
+def _(ctx):
+    grid = create_perfora_grid(ctx['stats'])
+    return lambda: format_perfora_grid(grid)
+
+
+# --- Ingestion and the month page ---
+
+@benchmark('generate_items')
+def _(ctx):
+    # Cost of the synthetic items alone, included in ingest_pages
+    return lambda: sum(1 for _ in generate_items(ctx['n_items'], seed=ctx['seed']))
+
+
+@benchmark('ingest_pages')
+def _(ctx):
+    from database import ingest_pages
+    return lambda: ingest_pages(_pages(generate_items(ctx['n_items'], seed=ctx['seed'])))
+
+
+@benchmark('sync_snapshot')
+def _(ctx):
+    import tempfile
+    from database import sync_snapshot
+    table = SyntheticTable(make_items(min(ctx['n_items'], SAMPLE_ITEMS), seed=ctx['seed']))
+
+    def run():
+        # Full scan into an empty snapshot directory every time
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            return sync_snapshot(table, snapshot_dir, table_factory=lambda: table)
+    return run
+
+
+@benchmark('rollup.build_rollup')
+def _(ctx):
+    return lambda: rollup.build_rollup(ctx['df'])
+
+
+@benchmark('month_page')
+def _(ctx):
+    def run():
+        # Every view of one month page, as main.py draws it, computed by a model without any cached views
+        model = DashboardModel(ctx['df'], ctx['month_index'], {}, ctx['rollup'])
+        model.month_page(ctx['year'], ctx['month'])
+    return run
+
+
+def run_benchmarks(ctx, names, repeat):
+    results = {}
+    for name in names:
+        func = BENCHMARKS[name](ctx)
+        func()  # Warm up caches and imports
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        results[name] = {'median': statistics.median(times), 'min': min(times)}
+        print(f"{name:<32} median {1000 * results[name]['median']:10.2f} ms   min {1000 * min(times):10.2f} ms")
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """Returns the names of the benchmarks slower than the baseline, printing each comparison."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline['results']:
+            continue
+        # The best of the repeats is the least affected by other load on the machine
+        before = baseline['results'][name]['min']
+        after = result['min']
+        ratio = after / before if before else float('inf')
+        slower = after > before * (1 + tolerance) and after - before > min_delta
+        if slower:
+            regressions.append(name)
+        print(f"{name:<32} {1000 * before:10.2f} -> {1000 * after:10.2f} ms  x{ratio:5.2f}"
+              f"{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000, help='synthetic items (about 2.5 rows each)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--only', nargs='*', help='benchmarks to run (default: all)')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save', action='store_true', help='store the timings as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='allowed relative slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='ignored absolute slowdown')
+    args = parser.parse_args(argv)
+
+    pd.set_option('mode.copy_on_write', True)
+    # plotly.express groups categoricals without observed=, which pandas warns about on every call
+    warnings.simplefilter('ignore', FutureWarning)
+    names = args.only or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    ctx = build_context(args.items, args.seed)
+    print(f"{args.items} items, {len(ctx['df'])} rows, page {ctx['year']}-{ctx['month']:02d} "
+          f"({len(ctx['month_df'])} rows), built in {time.perf_counter() - start:.1f} s\n")
+    results = run_benchmarks(ctx, names, args.repeat)
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update({
+            'items': args.items,
+            'rows': len(ctx['df']),
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        })
+        baseline['results'] = dict(baseline.get('results', {}), **results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, run with --save to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('items') != args.items or baseline.get('seed') != args.seed:
+        print(f"\nBaseline was taken with {baseline.get('items')} items (seed {baseline.get('seed')}), "
+              f"not comparing")
+        return 0
+    print()
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms / 1000)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Speedup of the parallel DynamoDB scan over a sequential one, on a SyntheticTable with latency.
+
+For every table size the scan (iter_parallel_scan_pages, pages discarded) and the full
+first sync (sync_snapshot into an empty snapshot) are timed with one segment and with
+--segments segments. Every scan call sleeps --latency seconds like a DynamoDB round trip:
+
+    python benchmarks/scan_speedup.py
+    python benchmarks/scan_speedup.py --sizes 10000 100000 --latency 0.05 --scan-only
+
+Large tables repeat a pool of POOL_ITEMS synthetic items, so 1M items fit in memory.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+from itertools import cycle, islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import iter_parallel_scan_pages, sync_snapshot
+from synthetic import SyntheticTable, make_items
+
+# Distinct items generated; bigger tables cycle through them
+POOL_ITEMS = 20000
+
+
+def scan(table, segments):
+    for _ in iter_parallel_scan_pages(table, segments, segments, table_factory=lambda: table):
+        pass
+
+
+def sync(table, segments):
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        sync_snapshot(table, snapshot_dir, segments, segments, table_factory=lambda: table)
+
+
+def timed_run(func, table, segments):
+    start = time.perf_counter()
+    func(table, segments)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--segments', type=int, default=8, help="Segments of the parallel run")
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds per scan call")
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--scan-only', action='store_true', help="Skip the full sync_snapshot runs")
+    args = parser.parse_args()
+    warnings.simplefilter('ignore', FutureWarning)
+
+    pool = make_items(min(max(args.sizes), POOL_ITEMS))
+    runs = [('scan', scan)] + ([] if args.scan_only else [('sync', sync)])
+    print(f"latency {1000 * args.latency:.0f} ms per page of {args.page_size} items")
+    for size in args.sizes:
+        table = SyntheticTable(list(islice(cycle(pool), size)), args.page_size, args.latency)
+        for name, func in runs:
+            sequential = timed_run(func, table, 1)
+            parallel = timed_run(func, table, args.segments)
+            print(f"{size:>9} items  {name:<5} 1 segment {sequential:8.2f} s   "
+                  f"{args.segments} segments {parallel:8.2f} s   speedup x {sequential / parallel:5.2f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import pandas as pd
+import plotly.graph_objects as go
+
+from config import PV_CHART_MAX_BARS, PV_CHART_WEBGL_POINTS
+from profiling import timed
+
+OTHERS_LABEL = 'Otros'
+
+
+def top_n_with_others(df, label_column, value_column, max_rows, how='sum'):
+    """
+    Keeps the max_rows largest rows by value_column and folds the rest into one row.
+
+    Parameters:
+    - df (pd.DataFrame): Rows to plot, one bar each.
+    - label_column (str): Column used as the bar label; the folded row is labelled
+      'Otros (<n> PV)' with n the number of distinct labels it covers.
+    - value_column (str): Column ranked and aggregated.
+    - max_rows (int): Rows kept as they are, or None to keep every row.
+    - how (str): 'sum' or 'mean', how the folded rows are aggregated.
+
+    Returns:
+    - pd.DataFrame: df itself when it is small enough, otherwise the top rows plus the
+      folded row, with label_column as object. Other columns are NaN in the folded row.
+    """
+    if max_rows is None or len(df) <= max_rows + 1:
+        return df
+    ordered = df.sort_values(value_column, ascending=False, kind='stable')
+    top, rest = ordered.iloc[:max_rows], ordered.iloc[max_rows:]
+    others = pd.DataFrame({
+        label_column: [f"{OTHERS_LABEL} ({rest[label_column].nunique()} PV)"],
+        value_column: [getattr(rest[value_column], how)()],
+    })
+    top = top.astype({label_column: object})
+    return pd.concat([top, others], ignore_index=True)
+
+
+def _pv_trace(x, y, text, hovertemplate, webgl_points):
+    # Bars are drawn by SVG; past webgl_points the chart switches to WebGL markers and
+    # keeps the annotation only in the hover, so no text label is laid out per point
+    if len(x) > webgl_points:
+        return go.Scattergl(x=x, y=y, mode='markers', customdata=text,
+                            marker=dict(color='LightSkyBlue'),
+                            hovertemplate=hovertemplate.replace('%{text}', '%{customdata}'))
+    return go.Bar(x=x, y=y, text=text, textposition='outside', marker=dict(color='LightSkyBlue'),
+                  hovertemplate=hovertemplate)
+
+
+@timed('charts.pv_placas_figure')
+def pv_placas_figure(df, max_bars=PV_CHART_MAX_BARS, webgl_points=PV_CHART_WEBGL_POINTS):
+    """
+    Bar chart of placas per PV with espesor as annotation.
+
+    Parameters:
+    - df (pd.DataFrame): Columns 'pv', 'espesor' and 'placas', largest first.
+    - max_bars (int): Bars drawn before the rest are summed into an 'Otros' bar.
+    - webgl_points (int): Point count above which WebGL markers replace the bars.
+    """
+    df = top_n_with_others(df, 'pv', 'placas', max_bars)
+    fig = go.Figure()
+    fig.add_trace(_pv_trace(
+        df['pv'], df['placas'],
+        df['espesor'],  # Add espesor as text annotations
+        '<b>PV:</b> %{x}<br>'
+        '<b>Placas:</b> %{y}<br>'
+        '<b>Espesor:</b> %{text}',
+        webgl_points,
+    ))
+
+    fig.update_layout(
+        xaxis_title='PV',
+        yaxis_title='Placas',
+        xaxis=dict(type='category'),
+        yaxis=dict(showgrid=True),
+        showlegend=False
+    )
+
+    # Adjust font size for annotations
+    fig.update_traces(textfont_size=12, selector=dict(type='bar'))
+
+    return fig
+
+
+@timed('charts.pv_process_figure')
+def pv_process_figure(df, max_bars=PV_CHART_MAX_BARS, webgl_points=PV_CHART_WEBGL_POINTS):
+    """
+    Bar chart of days in process per PV with a line at the average.
+
+    Parameters:
+    - df (pd.DataFrame): Columns 'pv' and 'Tiempo_Proceso_Dias', largest first.
+    - max_bars (int): Bars drawn before the rest are averaged into an 'Otros' bar.
+    - webgl_points (int): Point count above which WebGL markers replace the bars.
+    """
+    # The average is taken over every PV, before the smallest are folded together
+    average_time = df['Tiempo_Proceso_Dias'].mean()
+    df = top_n_with_others(df, 'pv', 'Tiempo_Proceso_Dias', max_bars, how='mean')
+
+    fig = go.Figure()
+    fig.add_trace(_pv_trace(df['pv'], df['Tiempo_Proceso_Dias'], None,
+                            '<b>PV:</b> %{x}<br><b>Tiempo:</b> %{y}<extra></extra>', webgl_points))
+
+    # Add horizontal line for average time
+    fig.add_hline(y=average_time, line_dash="dashdot", line_color="red",
+                  annotation_text=f"Average: {average_time:.2f}", annotation_position="bottom right")
+
+    fig.update_layout(
+        title="Dias/Pv en Proceso",
+        xaxis_title='PV',
+        yaxis_title='Tiempo Proceso (Dias)',
+        showlegend=False,
+        xaxis=dict(type='category'),
+        yaxis=dict(showgrid=True),
+        template='plotly_white'  # Setting a clean theme for clear visualization
+    )
+
+    return fig
+
+
+def cached_figure(view_cache, key, build):
+    """
+    Returns the figure stored under key, building it on a miss.
+
+    The Figure object itself is cached: st.plotly_chart re-validates a dict or JSON
+    input from scratch, which costs more than building the figure, while a cached
+    Figure only needs serializing.
+    """
+    return view_cache.get_or_compute(key, build)
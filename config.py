@@ -0,0 +1,44 @@
+# Configuration settings for the CNC dashboard
+
+# DynamoDB source table
+AWS_REGION = 'us-east-1'
+TABLE_NAME = 'sam-stack-irlaa-MecanizadoCloseTable-1IKYW80FKFRII'
+
+# Local columnar snapshot of the flattened table
+SNAPSHOT_DIR = 'data/snapshot'
+SNAPSHOT_FILE = 'mecanizado.parquet'
+SNAPSHOT_META_FILE = 'mecanizado.json'
+
+# Seconds between background syncs of the shared dataset with DynamoDB
+REFRESH_INTERVAL_SECONDS = 300
+
+# Seconds between checks of each open session for a new data version
+STATUS_POLL_SECONDS = 15
+
+# Parallel scan: DynamoDB Segment/TotalSegments and the thread pool that runs them
+SCAN_TOTAL_SEGMENTS = 8
+SCAN_MAX_WORKERS = 8
+
+# Raw scan pages allowed to wait in memory before they are flattened
+SCAN_QUEUE_PAGES = 16
+
+# Memory cap for the per-process cache of derived per-month views
+VIEW_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Price per mm of perforation. Each rule matches a negocio and optionally a tipoMecanizado
+# and a first date ('desde', YYYY-MM-DD). The matching rule with the latest 'desde' wins, rules
+# without one counting as oldest; between equal dates a rule with a tipoMecanizado wins.
+PRICE_RULES = [
+    {'negocio': 'sabimet', 'rate': 226},
+    {'negocio': 'steelk', 'rate': 108},
+]
+
+# Price used for rows that no rule matches
+PRICE_DEFAULT_RATE = 1
+
+# PV bar charts: the largest PVs are drawn as bars and the rest summed into one "Otros" bar.
+# None draws every PV
+PV_CHART_MAX_BARS = 50
+
+# Charts with more points than this are drawn as WebGL markers without text labels
+PV_CHART_WEBGL_POINTS = 500
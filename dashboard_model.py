@@ -0,0 +1,250 @@
+from charts import cached_figure, pv_placas_figure, pv_process_figure
+from config import VIEW_CACHE_MAX_BYTES
+from exports import bulk_export, export_bytes, month_export_frames
+from profiling import timed
+from rollup import (business_totals, machine_metrics, machine_profiles, monthly_business_totals,
+                    monthly_machine_metrics, perforation_profile, select_month)
+from util_functions import (calculate_max_average, comparison_bar_plot, create_perfora_grid, get_month_splits,
+                            group_and_avg, group_and_sum)
+from view_cache import ViewCache
+
+# Businesses with their own section on the month page
+NEGOCIOS = ('sabimet', 'steelk')
+
+
+def invalidate_views(view_cache, meta):
+    # Only the months touched by the last sync (and the full-history and comparison views) are dropped
+    touched = set(meta.get('touched_months', []))
+    version = meta.get('version', 0)
+    view_cache.invalidate(
+        lambda key: (key[0] in ('month', 'business', 'export', 'figure', 'profiles') and f"{key[1]}-{key[2]:02d}" in touched)
+                    or (key[0] in ('grid', 'compare', 'bulk') and key[-1] != version))
+
+
+@timed('compute_month_overview')
+def compute_month_overview(filtered_df, month_rollup):
+    df_to_download2, df_to_download3 = month_export_frames(filtered_df)
+
+    # KPIs are read from the month's rows of the rollup, not from the raw rows
+    metrics = machine_metrics(month_rollup[month_rollup['origen'] == 'Progreso'])
+
+    return {
+        'df_to_download2': df_to_download2,
+        'df_to_download3': df_to_download3,
+        'machine_metrics': metrics,
+        'totals': {
+            'avg_mm': metrics['avg_mm'].mean(),
+            'total_mm': metrics['total_mm'].sum(),
+            'reportes': int(metrics['reportes'].sum()),
+            'perforaciones': metrics['perforaciones'].sum(),
+        },
+    }
+
+
+@timed('compute_month_profiles')
+def compute_month_profiles(month_rollup):
+    progress_rollup = month_rollup[month_rollup['origen'] == 'Progreso']
+    perfora_total = perforation_profile(progress_rollup)
+    return {
+        'machines': machine_profiles(progress_rollup),
+        'general': group_and_avg(perfora_total, ['tipoMecanizado', 'espesor'],
+                                 'perforaTotal').sort_values('perforaTotal', ascending=False).reset_index(drop=True),
+    }
+
+
+@timed('compute_perfora_grid')
+def compute_perfora_grid(df):
+    # Only the columns the grid needs are taken from the full history
+    df_total = df.loc[df['origen'] == 'Progreso',
+                      ['Tiempo Proceso (min)', 'tipoMecanizado', 'maquina', 'espesor', 'perforaTotal']]
+    perforaciones_day_tipo = df_total.drop_duplicates(subset=['Tiempo Proceso (min)'], keep='first')
+    perforaciones_day_tipo = calculate_max_average(perforaciones_day_tipo)
+    return create_perfora_grid(perforaciones_day_tipo)
+
+
+@timed('compute_business_views')
+def compute_business_views(filtered_df_nego, nego_rollup):
+    # Process time analysis
+    columns_to_drop = [
+        'Inicio', 'cantidadPerforacionesTotal', 'Terminado', 'cantidadPerforacionesPlacas',
+        'kg', 'tipoMecanizado', 'progress_createdAt', 'origen', 'maquina', 'placas',
+        'hora_reporte', 'tiempo', 'tiempo_seteo', 'espesor', 'negocio', 'perforaTotal',
+        'Tiempo Proceso (min)'
+    ]
+
+    df_process_time = (filtered_df_nego
+        .drop_duplicates(subset=['Tiempo Proceso (min)'], keep='first')
+        .assign(Tiempo_Proceso_Dias=lambda x: (x['Tiempo Proceso (min)'] / (60 * 24)).round(2))
+        .drop(columns=columns_to_drop)
+        .groupby('pv', as_index=False, observed=True)['Tiempo_Proceso_Dias'].sum()
+        .sort_values('Tiempo_Proceso_Dias', ascending=False)
+        .reset_index(drop=True))
+
+    # Group data for the plot
+    grouped_df = (group_and_sum(filtered_df_nego, ['pv', 'espesor'], 'placas')
+        .groupby(['pv', 'espesor'], as_index=False, observed=True)['placas'].sum()
+        .sort_values('placas', ascending=False)
+        .reset_index(drop=True))
+
+    perfo_sum, mm_sum = business_totals(nego_rollup)
+
+    return {
+        'perfo_sum': perfo_sum,
+        'mm_sum': mm_sum,
+        'process_time': df_process_time,
+        'grouped': grouped_df,
+    }
+
+
+@timed('compute_comparison')
+def compute_comparison(data_rollup, periods):
+    machines = monthly_machine_metrics(data_rollup, periods)
+    business = monthly_business_totals(data_rollup, periods, list(NEGOCIOS))
+    # No charts are drawn for periods without any data
+    has_data = not (machines.empty and business.empty)
+    return {
+        'machines': machines,
+        'business': business,
+        'machines_figure': (comparison_bar_plot(machines, 'total_mm', 'maquina', 'Total mm por maquina')
+                            if has_data else None),
+        'business_figure': (comparison_bar_plot(business, 'total_mm', 'negocio', 'Total mm por negocio')
+                            if has_data else None),
+    }
+
+
+class DashboardModel:
+    """
+    Computes every view of the dashboard from one dataset, without Streamlit or boto3.
+
+    The dataset is what DataRefresher.current() returns: the flattened DataFrame, its
+    month index, the sync metadata and the rollup. Views are kept in a ViewCache under
+    keys that carry the data version (or the month version for per-month views), so
+    the same cache can be shared by every session and by batch workers; pass the
+    DataRefresher's on_update through invalidate_views to drop outdated entries.
+
+    Returned values are shared through the cache and must not be modified.
+    """
+
+    def __init__(self, df, month_index, meta, rollup, view_cache=None):
+        self.df = df
+        self.month_index = month_index
+        self.meta = meta
+        self.rollup = rollup
+        self.view_cache = view_cache if view_cache is not None else ViewCache(VIEW_CACHE_MAX_BYTES)
+
+    @property
+    def version(self):
+        return self.meta.get('version', 0)
+
+    def month_version(self, year, month):
+        """Version of the last sync that changed the month."""
+        return self.meta.get('month_versions', {}).get(f"{year}-{month:02d}", 0)
+
+    def month_views(self, year, month):
+        """
+        Returns {'overview': KPIs and export frames (None without rows),
+        'negocios': the businesses with rows in the month}.
+        """
+        return self.view_cache.get_or_compute(('month', year, month, self.month_version(year, month)),
+                                              lambda: self._compute_month_views(year, month))
+
+    def machine_profiles(self, year, month):
+        """
+        Perforations per tipoMecanizado and espesor of the month: {'machines': {maquina: profile},
+        'general': profile of every machine}.
+        """
+        return self.view_cache.get_or_compute(('profiles', year, month, self.month_version(year, month)),
+                                              lambda: compute_month_profiles(select_month(self.rollup, year, month)))
+
+    def business_views(self, year, month, negocio):
+        """Totals, process times and placas per PV of one business, or None without rows."""
+        if negocio not in self.month_views(year, month)['negocios']:
+            return None
+        return self.view_cache.get_or_compute(('business', year, month, self.month_version(year, month), negocio),
+                                              lambda: self._compute_month_business(year, month, negocio))
+
+    def business_figure(self, year, month, negocio, kind):
+        """The 'placas' or 'proceso' chart of a business, or None without rows."""
+        views = self.business_views(year, month, negocio)
+        if views is None:
+            return None
+        build = {
+            'placas': lambda: pv_placas_figure(views['grouped']),
+            'proceso': lambda: pv_process_figure(views['process_time']),
+        }[kind]
+        return cached_figure(self.view_cache,
+                             ('figure', year, month, self.month_version(year, month), negocio, kind), build)
+
+    def perfora_grid(self):
+        """Numeric perfora grid of the whole history (see create_perfora_grid)."""
+        return self.view_cache.get_or_compute(('grid', self.version), lambda: compute_perfora_grid(self.df))
+
+    def comparison(self, periods):
+        """Machine and business KPIs of several (year, month) periods, with their charts (None without data)."""
+        return self.view_cache.get_or_compute(('compare', tuple(periods), self.version),
+                                              lambda: compute_comparison(self.rollup, periods))
+
+    def export_key(self, year, month, name, export_format):
+        return ('export', year, month, self.month_version(year, month), name, export_format)
+
+    def cached_export(self, year, month, name, export_format):
+        """The file prepared by prepare_export, or None while it has not been prepared."""
+        return self.view_cache.get(self.export_key(year, month, name, export_format))
+
+    def prepare_export(self, year, month, name, export_format):
+        """Writes the 'Resumen' or 'Total' file of the month and keeps it in the cache."""
+        frame = self.month_views(year, month)['overview'][
+            {'Resumen': 'df_to_download2', 'Total': 'df_to_download3'}[name]]
+        data = export_bytes(frame, export_format)
+        self.view_cache.put(self.export_key(year, month, name, export_format), data)
+        return data
+
+    def bulk_key(self, periods, bundle, export_format):
+        return ('bulk', tuple(periods), bundle, export_format, self.version)
+
+    def cached_bulk(self, periods, bundle, export_format):
+        return self.view_cache.get(self.bulk_key(periods, bundle, export_format))
+
+    def prepare_bulk(self, periods, bundle, export_format):
+        """Builds the bulk export of several months (see exports.bulk_export) and keeps it in the cache."""
+        data = bulk_export(self.df, self.month_index, periods, bundle, export_format)
+        self.view_cache.put(self.bulk_key(periods, bundle, export_format), data)
+        return data
+
+    def month_page(self, year, month):
+        """
+        Every view of a month page at once, e.g. to precompute it in a batch worker.
+
+        Returns:
+        - dict: 'overview', 'profiles', 'grid' and, per business in NEGOCIOS, its views and charts
+          (None for a business without rows).
+        """
+        businesses = {}
+        for negocio in NEGOCIOS:
+            views = self.business_views(year, month, negocio)
+            businesses[negocio] = None if views is None else {
+                'views': views,
+                'figures': {kind: self.business_figure(year, month, negocio, kind) for kind in ('placas', 'proceso')},
+            }
+        return {
+            'overview': self.month_views(year, month)['overview'],
+            'profiles': self.machine_profiles(year, month),
+            'grid': self.perfora_grid(),
+            'businesses': businesses,
+        }
+
+    @timed('compute_month_views')
+    def _compute_month_views(self, year, month):
+        filtered_df = get_month_splits(self.df, self.month_index, year, month, [])['all']
+        month_rollup = select_month(self.rollup, year, month)
+        entry = self.month_index.get((year, month), {})
+        return {
+            'overview': compute_month_overview(filtered_df, month_rollup) if not filtered_df.empty else None,
+            # The business views are computed on their own when the business is selected
+            'negocios': [nego for nego in NEGOCIOS if len(entry.get(nego, []))],
+        }
+
+    @timed('compute_month_business')
+    def _compute_month_business(self, year, month, negocio):
+        filtered_df_nego = get_month_splits(self.df, self.month_index, year, month, [negocio])[negocio]
+        return compute_business_views(filtered_df_nego, select_month(self.rollup, year, month, negocio=negocio))
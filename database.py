@@ -0,0 +1,332 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import boto3
+import pandas as pd
+from boto3.dynamodb.conditions import Attr
+
+from config import (AWS_REGION, TABLE_NAME, SNAPSHOT_DIR, SNAPSHOT_FILE, SNAPSHOT_META_FILE,
+                    SCAN_TOTAL_SEGMENTS, SCAN_MAX_WORKERS, SCAN_QUEUE_PAGES)
+from profiling import record_stage, timed
+from util_functions import create_dataframe_from_items, concat_frames
+
+
+def get_table(table_name=TABLE_NAME, region_name=AWS_REGION):
+    dynamo = boto3.resource('dynamodb', region_name=region_name)
+    return dynamo.Table(table_name)
+
+
+def iter_scan_pages(table, **scan_kwargs):
+    """
+    Scans a DynamoDB table following LastEvaluatedKey and yields one page of items at a time.
+
+    Parameters:
+    - table: boto3 DynamoDB Table resource.
+    - scan_kwargs: Extra arguments for table.scan (e.g. FilterExpression, Segment).
+
+    Yields:
+    - list: The items of each page.
+    """
+    response = table.scan(**scan_kwargs)
+    yield response['Items']
+
+    while 'LastEvaluatedKey' in response:
+        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **scan_kwargs)
+        yield response['Items']
+
+
+def _thread_table(table):
+    # boto3 resources are not thread safe, so every worker builds its own from a new session
+    session = boto3.session.Session()
+    region_name = table.meta.client.meta.region_name
+    return session.resource('dynamodb', region_name=region_name).Table(table.name)
+
+
+def _scan_segment_into(table, segment, total_segments, emit, **scan_kwargs):
+    # Hands every ((segment, page number), items) pair of one segment to emit, stopping if it
+    # returns False, and returns the segment stats
+    start = time.perf_counter()
+    pages = 0
+    n_items = 0
+    for page in iter_scan_pages(table, Segment=segment, TotalSegments=total_segments, **scan_kwargs):
+        if not emit(((segment, pages), page)):
+            break
+        pages += 1
+        n_items += len(page)
+    return {
+        'segment': segment,
+        'pages': pages,
+        'items': n_items,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def iter_parallel_scan_pages(table, total_segments=SCAN_TOTAL_SEGMENTS, max_workers=SCAN_MAX_WORKERS,
+                             table_factory=None, segment_stats=None, **scan_kwargs):
+    """
+    Runs a Segment/TotalSegments parallel scan on a thread pool and yields pages as they arrive.
+
+    Every page comes with a (segment, page number) key; sorting by it gives the order a
+    sequential scan would have returned the items in.
+
+    Pages go through a bounded queue, so workers wait when the consumer falls behind and
+    at most SCAN_QUEUE_PAGES raw pages are waiting in memory at any time.
+
+    Parameters:
+    - table: boto3 DynamoDB Table resource.
+    - total_segments (int): Number of segments the table is split into.
+    - max_workers (int): Size of the thread pool.
+    - table_factory (callable): Returns the table object used by a worker. Defaults to a new
+      boto3 resource per worker.
+    - segment_stats (list): If given, the stats of every segment are appended to it.
+    - scan_kwargs: Extra arguments for table.scan (e.g. FilterExpression).
+
+    Yields:
+    - tuple: ((segment, page number), items) for each page, in arrival order.
+    """
+    if segment_stats is None:
+        segment_stats = []
+
+    if table_factory is None:
+        table_factory = lambda: _thread_table(table)
+
+    pages = queue.Queue(maxsize=SCAN_QUEUE_PAGES)
+    stop = threading.Event()
+
+    def put(obj):
+        # Gives up once the consumer is gone so workers never block forever
+        while not stop.is_set():
+            try:
+                pages.put(obj, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(segment):
+        try:
+            stats = _scan_segment_into(table_factory(), segment, total_segments, put, **scan_kwargs)
+            put(('done', stats))
+        except Exception as e:
+            put(('error', e))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for segment in range(total_segments):
+            executor.submit(run, segment)
+
+        finished = 0
+        while finished < total_segments:
+            key, value = pages.get()
+            if key == 'error':
+                raise value
+            if key == 'done':
+                segment_stats.append(value)
+                finished += 1
+                continue
+            yield key, value
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+    segment_stats.sort(key=lambda stats: stats['segment'])
+
+
+def ingest_pages(pages, on_progress=None):
+    """
+    Flattens scan pages as they arrive instead of collecting every raw item first.
+
+    Each page is turned into a columnar frame right away and its raw boto3 items are
+    released, so the raw items and the final DataFrame are never in memory together.
+
+    Parameters:
+    - pages (iterable): (key, items) pairs from iter_parallel_scan_pages. Frames are put
+      back in key order, so the result does not depend on which segment finished first.
+    - on_progress (callable): Called as on_progress(pages, items, rows) after every page.
+
+    Returns:
+    - pd.DataFrame: The same frame create_dataframe_from_items would build from all the items.
+    """
+    frames = []
+    n_pages = 0
+    n_items = 0
+    n_rows = 0
+    # Scanning and flattening overlap, so the time spent in each is added up per page
+    scan_seconds = 0.0
+    flatten_seconds = 0.0
+
+    waited = time.perf_counter()
+    for key, page in pages:
+        started = time.perf_counter()
+        scan_seconds += started - waited
+        frame = create_dataframe_from_items(page)
+        frames.append((key, frame))
+
+        n_pages += 1
+        n_items += len(page)
+        n_rows += len(frame)
+        if on_progress is not None:
+            on_progress(n_pages, n_items, n_rows)
+        waited = time.perf_counter()
+        flatten_seconds += waited - started
+
+    record_stage('database.scan', scan_seconds, rows_out=n_items)
+    record_stage('create_dataframe_from_items', flatten_seconds, rows_in=n_items, rows_out=n_rows)
+    if not frames:
+        return create_dataframe_from_items([])
+    frames.sort(key=lambda keyed_frame: keyed_frame[0])
+    return concat_frames([frame for _, frame in frames])
+
+
+def _track_high_water_mark(pages, state, known_keys=frozenset()):
+    # Passes the pages through, remembering the largest 'timestamp' seen. Items sitting exactly
+    # on the previous high-water mark that are already in the snapshot are skipped, the >= filter
+    # returns them again on every sync.
+    previous_mark = state['high_water_mark']
+    for key, page in pages:
+        if known_keys:
+            page = [item for item in page
+                    if not (item['timestamp'] == previous_mark
+                            and (str(item['pv']), str(item['posicion'])) in known_keys)]
+        for item in page:
+            if state['high_water_mark'] is None or item['timestamp'] > state['high_water_mark']:
+                state['high_water_mark'] = item['timestamp']
+        state['items'] += len(page)
+        yield key, page
+
+
+def month_keys(df):
+    """Returns the sorted 'YYYY-MM' keys of the months present in df['Terminado']."""
+    if df is None or df.empty:
+        return []
+    return sorted(df['Terminado'].dropna().dt.strftime('%Y-%m').unique())
+
+
+@timed('database.load_snapshot')
+def load_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Reads the local Parquet snapshot and its metadata.
+
+    Returns:
+    - tuple: (DataFrame or None, metadata dict). Both are empty when no snapshot exists yet.
+    """
+    data_path = os.path.join(snapshot_dir, SNAPSHOT_FILE)
+    meta_path = os.path.join(snapshot_dir, SNAPSHOT_META_FILE)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None, {}
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return pd.read_parquet(data_path), meta
+
+
+@timed('database.save_snapshot')
+def save_snapshot(df, meta, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Writes the snapshot and its metadata. Files are written to a temporary
+    name first so a crash never leaves a half-written snapshot behind.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    data_path = os.path.join(snapshot_dir, SNAPSHOT_FILE)
+    meta_path = os.path.join(snapshot_dir, SNAPSHOT_META_FILE)
+
+    df.to_parquet(data_path + '.tmp', index=False)
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    os.replace(data_path + '.tmp', data_path)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+@timed('database.merge_items')
+def merge_items(snapshot_df, new_df, key_columns=('pv', 'posicion')):
+    """
+    Appends newly synced rows to the snapshot. Rows of items that were synced
+    again (same pv/posicion) replace the old ones instead of being duplicated.
+
+    Returns:
+    - tuple: (merged DataFrame, DataFrame with the snapshot rows that were replaced).
+    """
+    if snapshot_df is None or snapshot_df.empty:
+        return new_df.reset_index(drop=True), new_df.iloc[0:0]
+    if new_df.empty:
+        return snapshot_df, snapshot_df.iloc[0:0]
+
+    key_columns = list(key_columns)
+    new_keys = pd.MultiIndex.from_frame(new_df[key_columns].astype(str))
+    old_keys = pd.MultiIndex.from_frame(snapshot_df[key_columns].astype(str))
+    replaced = old_keys.isin(new_keys)
+
+    return concat_frames([snapshot_df[~replaced], new_df]), snapshot_df[replaced]
+
+
+@timed('database.sync_snapshot')
+def sync_snapshot(table, snapshot_dir=SNAPSHOT_DIR, total_segments=SCAN_TOTAL_SEGMENTS,
+                  max_workers=SCAN_MAX_WORKERS, table_factory=None, on_progress=None):
+    """
+    Brings the local snapshot up to date and returns the flattened DataFrame with its metadata.
+
+    Only items whose 'timestamp' is at or after the stored high-water mark are
+    fetched. The first call (no snapshot on disk) falls back to a full scan.
+    Pages are flattened as they arrive (see ingest_pages).
+
+    Note: a filtered Scan still reads the whole table on the DynamoDB side; what
+    it saves is transfer and flattening. Callers should reuse the returned frame
+    between reruns (see REFRESH_INTERVAL_SECONDS) so interactions do not hit DynamoDB.
+
+    Parameters:
+    - table: boto3 DynamoDB Table resource.
+    - snapshot_dir (str): Directory holding the Parquet snapshot.
+    - total_segments, max_workers, table_factory: Passed to iter_parallel_scan_pages.
+    - on_progress (callable): Passed to ingest_pages.
+
+    Returns:
+    - tuple: (DataFrame, metadata). The DataFrame is the frame create_dataframe_from_items
+      produces for the whole table. The metadata holds a global 'version', a 'month_versions'
+      dict ('YYYY-MM' -> version of the last sync that changed that month) and the
+      'touched_months' of this sync, so derived views can be invalidated per month.
+    """
+    snapshot_df, meta = load_snapshot(snapshot_dir)
+    high_water_mark = meta.get('high_water_mark')
+
+    scan_kwargs = {}
+    known_keys = frozenset()
+    if snapshot_df is not None and high_water_mark:
+        scan_kwargs['FilterExpression'] = Attr('timestamp').gte(high_water_mark)
+        at_mark = snapshot_df[snapshot_df['Terminado'] == pd.to_datetime(high_water_mark, errors='coerce')]
+        known_keys = frozenset(zip(at_mark['pv'].astype(str), at_mark['posicion'].astype(str)))
+
+    segment_stats = []
+    state = {'high_water_mark': high_water_mark, 'items': 0}
+    pages = iter_parallel_scan_pages(table, total_segments, max_workers, table_factory,
+                                     segment_stats, **scan_kwargs)
+    new_df = ingest_pages(_track_high_water_mark(pages, state, known_keys), on_progress)
+
+    if state['items'] == 0 and snapshot_df is not None:
+        return snapshot_df, dict(meta, touched_months=[])
+
+    df, replaced_df = merge_items(snapshot_df, new_df)
+
+    version = meta.get('version', 0) + 1
+    touched_months = sorted(set(month_keys(new_df)) | set(month_keys(replaced_df)))
+    month_versions = dict(meta.get('month_versions', {}))
+    for month in touched_months:
+        month_versions[month] = version
+
+    meta = {
+        'high_water_mark': state['high_water_mark'],
+        'synced_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': len(df),
+        'version': version,
+        'month_versions': month_versions,
+        'touched_months': touched_months,
+        'scan_segments': segment_stats,
+    }
+    save_snapshot(df, meta, snapshot_dir)
+
+    return df, meta
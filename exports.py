@@ -0,0 +1,155 @@
+import zipfile
+from io import BytesIO
+
+import xlsxwriter
+
+from fixed_point import perforated_mm
+from pricing import add_cost
+from profiling import timed
+from util_functions import aggregate_with_attributes, filter_rows_by_column_value
+
+# File formats offered for download: extension and MIME type
+EXPORT_FORMATS = {
+    'xlsx': {'extension': 'xlsx', 'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+    'csv': {'extension': 'csv', 'mime': 'text/csv'},
+    'parquet': {'extension': 'parquet', 'mime': 'application/vnd.apache.parquet'},
+}
+
+
+# Attributes carried through the export aggregations, taken from the first row of each group
+_TOTAL_ATTRIBUTES = ['Terminado', 'cantidadPerforacionesPlacas', 'tipoMecanizado', 'espesor', 'negocio', 'cliente']
+_RESUMEN_ATTRIBUTES = ['Terminado', 'espesor', 'negocio', 'cliente']
+
+
+@timed('exports.month_export_frames')
+def month_export_frames(month_df):
+    """
+    Builds the 'Resumen' (per pv) and 'Total' (per pv and posicion) export tables of a month.
+
+    Parameters:
+    - month_df (pd.DataFrame): All rows of one month.
+
+    Returns:
+    - tuple: (resumen, total) DataFrames ready to be written.
+    """
+    progress = filter_rows_by_column_value(month_df, 'origen', 'Progreso', reset_index=True)
+
+    total = aggregate_with_attributes(progress, ['pv', 'posicion'], ['perforaTotal', 'placas'], _TOTAL_ATTRIBUTES)
+    total['mm de perforado'] = perforated_mm(total['perforaTotal'], total['espesor'])
+    add_cost(total)
+
+    resumen = aggregate_with_attributes(total, ['pv'], ['perforaTotal', 'mm de perforado', 'costo'],
+                                        _RESUMEN_ATTRIBUTES)
+
+    resumen = resumen.rename(columns={'perforaTotal': 'Total de Perforaciones'})
+    total = total.rename(columns={
+        'cantidadPerforacionesPlacas': 'Perforaciones por Placa',
+        'perforaTotal': 'Total de Perforaciones'
+    }).drop(columns=['posicion', 'tipoMecanizado'])
+
+    resumen['Terminado'] = resumen['Terminado'].dt.strftime('%Y-%m-%d')
+    total['Terminado'] = total['Terminado'].dt.strftime('%Y-%m-%d')
+    return resumen, total
+
+
+def export_file_name(name, year, month, export_format):
+    return f"cnc_{name}_{year}_{month}.{EXPORT_FORMATS[export_format]['extension']}"
+
+
+@timed('exports.export_bytes')
+def export_bytes(df, export_format):
+    """
+    Writes a DataFrame in one of EXPORT_FORMATS and returns the file contents.
+
+    Parameters:
+    - df (pd.DataFrame): Frame to export, written without its index.
+    - export_format (str): 'xlsx', 'csv' or 'parquet'.
+
+    Returns:
+    - bytes: The file contents.
+    """
+    if export_format == 'xlsx':
+        return _xlsx_bytes(df)
+    if export_format == 'csv':
+        # utf-8-sig so Excel opens accented text correctly
+        return df.to_csv(index=False).encode('utf-8-sig')
+    if export_format == 'parquet':
+        buffer = BytesIO()
+        df.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    raise ValueError(f"Unknown export format '{export_format}'.")
+
+
+@timed('exports.bulk_export')
+def bulk_export(df, month_index, periods, bundle='zip', export_format='xlsx'):
+    """
+    Writes the Resumen and Total files of several months into one download.
+
+    Months are read from their month_index partition one at a time, and each month's
+    tables are written and released before the next month is built.
+
+    Parameters:
+    - df (pd.DataFrame): The shared DataFrame.
+    - month_index (dict): build_month_index(df).
+    - periods (list): (year, month) tuples, in the order they are written.
+    - bundle (str): 'zip' for one file per month and table, 'workbook' for a single
+      xlsx with a 'Resumen YYYY-MM' and a 'Total YYYY-MM' sheet per month.
+    - export_format (str): Format of the files inside a zip bundle.
+
+    Returns:
+    - bytes: The zip or xlsx contents. Months without data are skipped.
+    """
+    buffer = BytesIO()
+    if bundle == 'zip':
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for year, month, resumen, total in _iter_month_exports(df, month_index, periods):
+                archive.writestr(export_file_name('Resumen', year, month, export_format),
+                                 export_bytes(resumen, export_format))
+                archive.writestr(export_file_name('Total', year, month, export_format),
+                                 export_bytes(total, export_format))
+    elif bundle == 'workbook':
+        workbook = _new_workbook(buffer)
+        for year, month, resumen, total in _iter_month_exports(df, month_index, periods):
+            _write_sheet(workbook, f"Resumen {year}-{month:02d}", resumen)
+            _write_sheet(workbook, f"Total {year}-{month:02d}", total)
+        if not workbook.worksheets():
+            workbook.add_worksheet('Sin datos')
+        workbook.close()
+    else:
+        raise ValueError(f"Unknown bundle '{bundle}'.")
+    return buffer.getvalue()
+
+
+def _iter_month_exports(df, month_index, periods):
+    for year, month in periods:
+        entry = month_index.get((year, month))
+        if entry is None:
+            continue
+        resumen, total = month_export_frames(df.iloc[entry['all']])
+        if not total.empty:
+            yield year, month, resumen, total
+
+
+def _new_workbook(buffer):
+    # In constant_memory mode xlsxwriter flushes each row as soon as the next one starts, so a
+    # sheet never sits in memory as a whole
+    return xlsxwriter.Workbook(buffer, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+
+
+def _write_sheet(workbook, sheet_name, df):
+    # Rows are written in order; DataFrame.to_excel writes column by column, which
+    # constant_memory mode cannot handle
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, [str(col) for col in df.columns], workbook.add_format({'bold': True}))
+
+    values = df.astype(object).where(df.notna(), None)
+    for row, record in enumerate(values.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row, 0, record)
+
+
+def _xlsx_bytes(df, sheet_name='Sheet1'):
+    buffer = BytesIO()
+    workbook = _new_workbook(buffer)
+    _write_sheet(workbook, sheet_name, df)
+    workbook.close()
+    return buffer.getvalue()
@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+import numpy as np
+
+# mm values are kept as integer micrometres, espesor is never finer than 1 µm
+MICROMETRES_PER_MM = 1000
+
+
+def _finite(values):
+    # Missing values (NaN from DynamoDB NULLs) would turn into INT64_MIN in the int cast
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(values)
+    return np.where(valid, values, 0.0), valid
+
+
+def to_micrometres(espesor):
+    """Converts espesor values in mm to int64 micrometres; missing values become 0."""
+    espesor, _ = _finite(espesor)
+    return np.rint(espesor * MICROMETRES_PER_MM).astype(np.int64)
+
+
+def mm_micrometres(perforaciones, espesor):
+    """
+    Returns the perforated length of every row in int64 micrometres.
+
+    Parameters:
+    - perforaciones (array-like): Number of perforations per row (perforaTotal).
+    - espesor (array-like): Thickness per row in mm.
+
+    Returns:
+    - np.ndarray: perforaciones * espesor in micrometres, exact while below 2**53. Rows
+      with a missing value count 0, so sums skip them like the float sums did.
+    """
+    perforaciones, _ = _finite(perforaciones)
+    return np.rint(perforaciones * to_micrometres(espesor)).astype(np.int64)
+
+
+def perforated_mm(perforaciones, espesor):
+    """
+    Returns the perforated mm of every row as float64, rounded once from micrometres.
+
+    Rows with a missing perforaciones or espesor are NaN.
+    """
+    _, valid_perforaciones = _finite(perforaciones)
+    _, valid_espesor = _finite(espesor)
+    mm = mm_micrometres(perforaciones, espesor) / MICROMETRES_PER_MM
+    return np.where(valid_perforaciones & valid_espesor, mm, np.nan)
+
+
+def decimal_mm(micrometres):
+    """Returns the exact mm of a sum of micrometres as a Decimal with three decimals."""
+    return Decimal(int(micrometres)).scaleb(-3)
@@ -1,18 +1,55 @@
-import boto3
+import threading
+from datetime import datetime
+
+import pandas as pd
 import streamlit as st
+from config import REFRESH_INTERVAL_SECONDS, STATUS_POLL_SECONDS, VIEW_CACHE_MAX_BYTES
+from dashboard_model import DashboardModel, invalidate_views
+from database import get_table, sync_snapshot
+from exports import EXPORT_FORMATS, export_file_name
+from refresher import DataRefresher
+from rollup import last_months, update_rollup, year_over_year
+from profiling import begin_run, capture_report, recent_records, records_json, run_records, stage, start_capture
+from sections import lazy_section, reset_section_timings, select_section, show_section_timings
+from styling import style_perfora_grid, styled_table
 from util_functions import *  # Import all functions from util_functions.py
+from view_cache import ViewCache
+
+# Every session reads the same DataFrame from get_refresher(). With copy-on-write, frames
+# derived from it share its memory until written to, and writes never reach the shared copy.
+pd.set_option('mode.copy_on_write', True)
+
+# Stages of this rerun, shown in the admin profiler panel (?admin=1)
+begin_run()
+profile_capture = start_capture() if st.session_state.pop('profile_next_run', False) else None
+
+
+# Derived per-month views, shared by every session of the process
+@st.cache_resource
+def get_view_cache():
+    return ViewCache(VIEW_CACHE_MAX_BYTES)
 
-# Initialize DynamoDB resource
-dynamo = boto3.resource('dynamodb', region_name='us-east-1')
-table = dynamo.Table('sam-stack-irlaa-MecanizadoCloseTable-1IKYW80FKFRII')
 
-# Scan the DynamoDB table and retrieve all items
-response = table.scan()
-items = response['Items']
+# One dataset per process, kept up to date by a background thread every
+# REFRESH_INTERVAL_SECONDS so interactions never wait for DynamoDB
+@st.cache_resource
+def get_refresher():
+    view_cache = get_view_cache()
+    return DataRefresher(lambda on_progress=None: sync_snapshot(get_table(), on_progress=on_progress),
+                         build_month_index, REFRESH_INTERVAL_SECONDS,
+                         on_update=lambda meta: invalidate_views(view_cache, meta),
+                         update_rollup=update_rollup)
+
+
+# The first load runs in the session so it can report its progress to the sidebar
+def load_data(on_progress=None):
+    refresher = get_refresher()
+    refresher.ensure_loaded(on_progress)
+    df, month_index, meta, rollup = refresher.current()
+    # Shallow copies share the refresher's memory, but with copy-on-write any column
+    # assignment or value write in this session only changes the session's objects
+    return df.copy(deep=False), month_index, meta, rollup.copy(deep=False)
 
-while 'LastEvaluatedKey' in response:
-    response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-    items.extend(response['Items'])
 
 # Get months and years since a particular date
 months, years, cm, cy = get_months_and_years_since("01/10/2024")
@@ -366,143 +403,216 @@ with st.sidebar:
         key='year_selector'
     )
 
+    # Compare modes end at the selected month
+    view_mode = st.radio(
+        'View',
+        ['Single month', 'Month range', 'Year over year'],
+        key='view_mode'
+    )
+
+    if view_mode == 'Month range':
+        range_months = st.slider('Months', min_value=2, max_value=24, value=6, key='range_months')
+
     st.markdown("</div>", unsafe_allow_html=True)
 
+    # Info Section, filled by show_data_status once the data is loaded
+    data_status = st.container()
+
+    # Shows the scan progress while the data is loading
+    sync_status = st.empty()
+
+
+# --- Process the data ---
+def show_sync_progress(pages, items, rows):
+    sync_status.caption(f"Cargando datos: {pages} páginas, {items} registros, {rows} filas")
+
+
+with stage('load_data'):
+    df, month_index, data_meta, data_rollup = load_data(show_sync_progress)
+sync_status.empty()
+# All the KPIs, tables and figures come from the headless model; this script only draws them
+model = DashboardModel(df, month_index, data_meta, data_rollup, get_view_cache())
+st.session_state['data_version'] = data_meta.get('version', 0)
+
+
+# Polls the shared dataset: shows the real refresh time and lag, and reruns the
+# session only when the background refresher published a new data version
+@st.fragment(run_every=STATUS_POLL_SECONDS)
+def show_data_status():
+    status = get_refresher().status()
+    if status['version'] != st.session_state.get('data_version'):
+        st.rerun()
+
+    if status['last_error']:
+        state = f"Error ({status['last_error']})"
+    elif status['lag_seconds'] is not None and status['lag_seconds'] > 2 * REFRESH_INTERVAL_SECONDS:
+        state = 'Stale'
+    else:
+        state = 'Live'
+    last_refresh = (datetime.fromtimestamp(status['last_refresh']).strftime('%Y-%m-%d %H:%M:%S')
+                    if status['last_refresh'] else '-')
+    lag = f"{int(status['lag_seconds'])} s" if status['lag_seconds'] is not None else '-'
+
     # Info Section with shimmer effect
-    st.markdown("""
+    st.markdown(f"""
         <div class="info-container">
             <div class="section-title">
                 <span>ℹ️</span> Dashboard Info
             </div>
             <div style="color: #666; font-size: 14px;">
-                Last updated: Today<br>
-                Status: Live
+                Last updated: {last_refresh}<br>
+                Lag: {lag}<br>
+                Status: {state}
             </div>
         </div>
     """, unsafe_allow_html=True)
 
 
-# --- Process the data ---
-df = create_dataframe_from_items(items)
-filtered_df_sabimet = filter_by_year_month(df, selected_year, selected_month, 'sabimet')
-filtered_df_steelk = filter_by_year_month(df, selected_year, selected_month, 'steelk')
-filtered_df = filter_by_year_month_only(df, selected_year, selected_month)
-
+with data_status:
+    show_data_status()
 
 
-if not filtered_df.empty:
-    # --- Overview Section ---
-    st.markdown("<div class='stHeader'><h1>Kupfer Nave1/CNC Dashboard</h1></div>", unsafe_allow_html=True)
-    # st.write("Produccion CNC en la Nave1.")
-
-    # --- Key Performance Indicators (KPIs) ---
-    espesor_progress = filter_rows_by_column_value(filtered_df, 'origen', 'Progreso', reset_index=True)
-    # print(espesor_progress.columns)
-    # total_columns ['pv', 'Inicio', 'cantidadPerforacionesTotal', 'Terminado',
-    #    'cantidadPerforacionesPlacas', 'kg', 'tipoMecanizado',
-    #    'progress_createdAt', 'origen', 'maquina', 'placas', 'hora_reporte',
-    #    'tiempo', 'tiempo_seteo', 'espesor', 'negocio', 'cliente',
-    #    'perforaTotal', 'Tiempo Proceso (min)']
+# --- Bulk export: Resumen and Total files for a quarter or a year in one download ---
+with st.sidebar:
+    with st.expander("Exportación masiva", expanded=False):
+        bulk_range = st.radio('Rango', ['Trimestre', 'Año'], horizontal=True, key='bulk_range')
+        bulk_bundle = st.radio('Archivo', ['zip', 'workbook'], horizontal=True, key='bulk_bundle')
+        bulk_format = 'xlsx'
+        if bulk_bundle == 'zip':
+            bulk_format = st.radio('Formato', list(EXPORT_FORMATS), horizontal=True, key='bulk_format')
+
+        if bulk_range == 'Trimestre':
+            first_month = (selected_month - 1) // 3 * 3 + 1
+            bulk_periods = [(selected_year, month) for month in range(first_month, first_month + 3)]
+        else:
+            bulk_periods = [(selected_year, month) for month in range(1, 13)]
+        bulk_label = f"{selected_year}-{bulk_periods[0][1]:02d}_{bulk_periods[-1][1]:02d}"
+
+        bulk_data = model.cached_bulk(bulk_periods, bulk_bundle, bulk_format)
+        if bulk_data is None:
+            st.button(f"Preparar - {bulk_label}", key='prepare_bulk',
+                      on_click=model.prepare_bulk, args=(bulk_periods, bulk_bundle, bulk_format))
+        else:
+            extension = 'zip' if bulk_bundle == 'zip' else 'xlsx'
+            mime = 'application/zip' if bulk_bundle == 'zip' else EXPORT_FORMATS['xlsx']['mime']
+            st.download_button(f"Descargar - {bulk_label}", bulk_data, file_name=f"cnc_{bulk_label}.{extension}",
+                               mime=mime, key='download_bulk')
+
+
+# Files are only written when asked for; the result is kept per month, data version and format
+def show_download(name, export_format):
+    data = model.cached_export(selected_year, selected_month, name, export_format)
+    if data is None:
+        st.button(f"Preparar - {name} - {selected_year} - {selected_month}", key=f"prepare_{name}",
+                  on_click=model.prepare_export, args=(selected_year, selected_month, name, export_format))
+    else:
+        st.download_button(f"Descargar - {name} - {selected_year} - {selected_month}", data,
+                           file_name=export_file_name(name, selected_year, selected_month, export_format),
+                           mime=EXPORT_FORMATS[export_format]['mime'], key=f"download_{name}")
+
+
+def profile_rows(records):
+    return pd.DataFrame([{
+        'stage': '  ' * record['depth'] + record['stage'],
+        'ms': round(1000 * record['seconds'], 1),
+        'rows_in': record['rows_in'],
+        'rows_out': record['rows_out'],
+        'memory_mb': (None if record['memory_delta_bytes'] is None
+                      else round(record['memory_delta_bytes'] / 2 ** 20, 1)),
+        'thread': record['thread'],
+    } for record in records], columns=['stage', 'ms', 'rows_in', 'rows_out', 'memory_mb', 'thread'])
+
+
+# Admin panel with the stages of this rerun and of the background syncs. Must run last,
+# before any st.stop(), so the rerun is complete.
+def show_profiler():
+    if profile_capture is not None:
+        st.session_state['profile_report'] = capture_report(profile_capture)
+    if st.query_params.get('admin') != '1':
+        return
+    records = run_records()
+    background = [record for record in recent_records() if record['thread'] != threading.current_thread().name]
+    with st.sidebar.expander("Profiler", expanded=False):
+        st.caption(f"Esta ejecución: {len(records)} etapas")
+        st.dataframe(profile_rows(records), hide_index=True, use_container_width=True)
+        st.caption("Sincronizaciones en segundo plano")
+        st.dataframe(profile_rows(background[-50:]), hide_index=True, use_container_width=True)
+        st.download_button("Descargar JSON", records_json({'run': records, 'background': background}),
+                           file_name='profile.json', mime='application/json', key='download_profile')
+        st.button("Perfilar la próxima ejecución (cProfile)", key='profile_next',
+                  on_click=lambda: st.session_state.update(profile_next_run=True))
+        if 'profile_report' in st.session_state:
+            st.code(st.session_state['profile_report'])
+
+
+# --- Range / year-over-year comparison, read from the rollup only ---
+if view_mode != 'Single month':
+    if view_mode == 'Month range':
+        periods = last_months(selected_year, selected_month, range_months)
+    else:
+        periods = year_over_year(selected_year, selected_month)
 
-    columns_to_drop_download = [ 'Inicio','progress_createdAt', 'origen', 'maquina', 'tiempo', 'tiempo_seteo',
-                                 'hora_reporte', 'Tiempo Proceso (min)']
+    comparison = model.comparison(periods)
+    machines = comparison['machines']
+    business = comparison['business']
+    labels = [f"{year}-{month:02d}" for year, month in periods]
 
+    st.markdown(f"<div class='stHeader'><h1>Comparación {labels[0]} / {labels[-1]}</h1></div>",
+                unsafe_allow_html=True)
 
-    columns_to_drop_download2 = [ 'cantidadPerforacionesTotal', 'posicion', 'kg','Perforaciones por Placa', 'placas',
-                                  'tipoMecanizado']
+    if machines.empty and business.empty:
+        show_no_data_message("la comparación", f"{labels[0]} - {labels[-1]}", selected_year)
+        show_profiler()
+        st.stop()
 
-    columns_to_drop_download3 = ['cantidadPerforacionesTotal', 'posicion', 'kg', 'tipoMecanizado']
+    st.subheader("Maquinas")
+    st.plotly_chart(comparison['machines_figure'], use_container_width=True)
+    for value, title in [('total_mm', 'Total mm'), ('avg_mm', 'mm/day'), ('reportes', 'Reportes'),
+                         ('perforaciones', 'Perforaciones')]:
+        pivot = machines.pivot(index='maquina', columns='periodo', values=value).reindex(columns=labels)
+        pivot.columns = pivot.columns.astype(object)
+        st.markdown(f"**{title}**")
+        st.dataframe(pivot.style.format(precision=2), use_container_width=True)
 
-    df_to_download = espesor_progress.drop(columns=columns_to_drop_download)
+    st.subheader("Sabimet / Steelk")
+    st.plotly_chart(comparison['business_figure'], use_container_width=True)
+    for value, title in [('total_mm', 'Total mm'), ('perforaciones', 'Total Perforaciones')]:
+        pivot = business.pivot(index='negocio', columns='periodo', values=value).reindex(columns=labels)
+        pivot.columns = pivot.columns.astype(object)
+        st.markdown(f"**{title}**")
+        st.dataframe(pivot.style.format(precision=2), use_container_width=True)
 
+    show_profiler()
+    st.stop()
 
 
-    df_to_download3 = group_and_sum_without_remove_columns(df_to_download,
-                                                           ['pv', 'posicion'],
-                                                           ['perforaTotal', 'placas'])
+# Derived views are cached per month and only recomputed when a sync touches that month
+month_views = model.month_views(selected_year, selected_month)
+reset_section_timings()
 
-    df_to_download2 = group_and_sum_without_remove_columns2(df_to_download3,
-                                                           ['pv'],
-                                                           ['perforaTotal',
-                                                            'mm de perforado', 'costo'])
 
 
-    # Rename columns
-    df_to_download2 = df_to_download2.rename(columns={
-        'cantidadPerforacionesPlacas': 'Perforaciones por Placa',
-        'perforaTotal': 'Total de Perforaciones'
-    })
 
-    df_to_download3 = df_to_download3.rename(columns={
-        'cantidadPerforacionesPlacas': 'Perforaciones por Placa',
-        'perforaTotal': 'Total de Perforaciones'
-    })
+if month_views['overview'] is not None:
+    # --- Overview Section ---
+    st.markdown("<div class='stHeader'><h1>Kupfer Nave1/CNC Dashboard</h1></div>", unsafe_allow_html=True)
+    # st.write("Produccion CNC en la Nave1.")
 
-    df_to_download2 = df_to_download2.drop(columns=columns_to_drop_download2)
-    df_to_download3 = df_to_download3.drop(columns=columns_to_drop_download3)
-    # Add the download button for DataFrame
-    df_to_download2['Terminado'] = df_to_download2['Terminado'].dt.strftime('%Y-%m-%d')
-    df_to_download3['Terminado'] = df_to_download3['Terminado'].dt.strftime('%Y-%m-%d')
+    # --- Key Performance Indicators (KPIs) ---
+    overview = month_views['overview']
+    metrics = overview['machine_metrics']
 
     with st.expander("Archivos para descargar", expanded=True):
+        export_format = st.radio('Formato', list(EXPORT_FORMATS), horizontal=True, key='export_format')
         col1, col2 = st.columns(2)
 
         with col1:
-            st.markdown(get_table_download_link(
-                df_to_download2,
-                selected_year,
-                selected_month,
-                'Resumen'
-            ), unsafe_allow_html=True)
+            show_download('Resumen', export_format)
 
         with col2:
-            st.markdown(get_table_download_link(
-                df_to_download3,
-                selected_year,
-                selected_month,
-                'Total'
-            ), unsafe_allow_html=True)
-
-    espesor_total = expand_datetime_column(espesor_progress, 'progress_createdAt')
+            show_download('Total', export_format)
 
-    perfora_total = group_and_sum(espesor_total, ['t'
-                                                  'ipoMecanizado', 'espesor'], 'perforaTotal')
 
-    mm_T = espesor_total['espesor'] * espesor_total['perforaTotal']
-
-    espesor_m1 = filter_rows_by_column_value(espesor_progress, 'maquina', 'm1', reset_index=True)
-
-    perforaciones_m1 = group_and_sum(espesor_m1, ['tipoMecanizado', 'espesor'], 'perforaTotal')
-    espesor_m1['mm_perforado'] = espesor_m1['espesor'] * espesor_m1['perforaTotal']
-
-
-    avg_mm_m1 = espesor_m1['mm_perforado'].mean()
-    perfo_m1= espesor_m1["perforaTotal"].sum()
-    total_mm_m1 = espesor_m1['mm_perforado'].sum()
-    # Get the count of non-null entries
-    divisor_mm_m1 = espesor_m1['mm_perforado'].count()
-
-    espesor_m2 = filter_rows_by_column_value(espesor_progress, 'maquina', 'm2', reset_index=True)
-    perforaciones_m2 = group_and_sum(espesor_m2, ['tipoMecanizado', 'espesor'], 'perforaTotal')
-    espesor_m2['mm_perforado'] = espesor_m2['espesor'] * espesor_m2['perforaTotal']
-
-
-    avg_mm_m2 = espesor_m2['mm_perforado'].mean()
-    total_mm_m2 = espesor_m2['mm_perforado'].sum()
-    perfo_m2= espesor_m2["perforaTotal"].sum()
-    # Get the count of non-null entries
-    divisor_mm_m2 = espesor_m2['mm_perforado'].count()
-
-
-    espesor_m3 = filter_rows_by_column_value(espesor_progress, 'maquina', 'm3', reset_index=True)
-    perforaciones_m3 = group_and_sum(espesor_m3, ['tipoMecanizado', 'espesor'], 'perforaTotal')
-    espesor_m3['mm_perforado'] = espesor_m3['espesor'] * espesor_m3['perforaTotal']
-
-    avg_mm_m3 = espesor_m3['mm_perforado'].mean()
-    total_mm_m3 = espesor_m3['mm_perforado'].sum()
-    # Get the count of non-null entries
-    perfo_m3= espesor_m3["perforaTotal"].sum()
-    divisor_mm_m3 = espesor_m3['mm_perforado'].count()
 
 
     # Custom CSS for divider lines and cards
@@ -530,9 +640,6 @@ if not filtered_df.empty:
         </style>
     """, unsafe_allow_html=True)
 
-    # Creating three columns for organized display
-    col1, col2, col3 = st.columns(3)
-
 
     # Function to display metrics with improved text, icons, and dividers
     def display_metrics(column, prefix, avg_value, total_value, days_value, perfo_value):
@@ -560,20 +667,13 @@ if not filtered_df.empty:
         """, unsafe_allow_html=True)
 
 
-    # Displaying metrics for M1
-    display_metrics(col1, "M1 Metrics", avg_mm_m1, total_mm_m1, divisor_mm_m1, perfo_m1)
-
-    # Displaying metrics for M2
-    display_metrics(col2, "M2 Metrics", avg_mm_m2, total_mm_m2, divisor_mm_m2, perfo_m2)
-
-    # Displaying metrics for M3
-    display_metrics(col3, "M3 Metrics", avg_mm_m3, total_mm_m3, divisor_mm_m3, perfo_m3)
+    # One column and card per machine found in the month
+    if len(metrics):
+        for column, (machine, row) in zip(st.columns(len(metrics)), metrics.iterrows()):
+            display_metrics(column, f"{machine.upper()} Metrics", row['avg_mm'], row['total_mm'],
+                            int(row['reportes']), row['perforaciones'])
 
-    # Calculating total values
-    total_avg_mm = (avg_mm_m1 + avg_mm_m2 + avg_mm_m3) / 3
-    total_mm = total_mm_m1 + total_mm_m2 + total_mm_m3
-    total_days = divisor_mm_m1 + divisor_mm_m2 + divisor_mm_m3
-    total_perfo =perfo_m1 + perfo_m2 + perfo_m3
+    totals = overview['totals']
 
     # Displaying total metrics in a new row
     st.markdown("<h3>Totales</h3>", unsafe_allow_html=True)
@@ -594,42 +694,22 @@ if not filtered_df.empty:
 
 
     # Total average mm/day
-    display_total_metric(total_col1, "Promedio. mm/day", f"{round(total_avg_mm, 2)} mm", "📊")
+    display_total_metric(total_col1, "Promedio. mm/day", f"{round(totals['avg_mm'], 2)} mm", "📊")
 
     # Total mm
-    display_total_metric(total_col2, "Total mm", f"{round(total_mm, 2)} mm", "📏")
+    display_total_metric(total_col2, "Total mm", f"{round(totals['total_mm'], 2)} mm", "📏")
 
     # Total number of days
-    display_total_metric(total_col3, "Reportes", total_days, "📅")
+    display_total_metric(total_col3, "Reportes", totals['reportes'], "📅")
 
     # Total perforaciones
-    display_total_metric(total_col4, "Perforaciones", total_perfo, "🔧")
+    display_total_metric(total_col4, "Perforaciones", totals['perforaciones'], "🔧")
 
     # --- Perforaciones Grid Visualization ---
-    with st.expander("Perfil General Perforaciones", expanded=False):
-        df_total = filter_rows_by_column_value(df, 'origen', 'Progreso', reset_index=True)
-        df_total = expand_datetime_column(df_total, 'progress_createdAt')
-
-        columns_to = [
-            'pv', 'Inicio', 'cantidadPerforacionesTotal', 'Terminado', 'cantidadPerforacionesPlacas',
-            'kg', 'progress_createdAt', 'origen', 'placas', 'hora_reporte', 'tiempo', 'tiempo_seteo', 'negocio',
-            'Tiempo Proceso (min)', 'minute'
-        ]
-        perforaciones_day_tipo = ( df_total.drop_duplicates(subset=['Tiempo Proceso (min)'], keep='first')).drop(
-            columns=columns_to)
-        perforaciones_day_tipo = calculate_max_average(perforaciones_day_tipo)
-        grid = create_perfora_grid(perforaciones_day_tipo)
-
+    # Closed sections are neither computed nor serialized on a rerun
+    def render_perfora_grid(grid):
         # --- Styling the DataFrame ---
-        grid = grid.style.format(precision=2)  # Format numbers to two decimal places
-        grid = grid.applymap(highlight_na_and_conditions) # Apply existing color conditions
-        grid = grid.apply(highlight_espesor_change, axis=None) # Apply existing row highlighting
-        grid = grid.set_table_styles([
-            {'selector': 'th', 'props': [('background-color', '#f0f2f5'), ('font-size', '14px'), ('text-align', 'center')]}, # Style headers
-            {'selector': 'td', 'props': [('font-size', '12px'), ('text-align', 'center')]}, # Style cells
-            {'selector': 'table', 'props': [('border-collapse', 'collapse'), ('width', '100%')]}, # Style table
-            {'selector': 'th, td', 'props': [('border', '1px solid #ddd'), ('padding', '8px')]} # Add borders and padding
-        ])
+        grid = style_perfora_grid(grid)
 
         # --- Interactive Table with st.dataframe ---
         st.dataframe(grid, height=400, use_container_width=True)
@@ -639,78 +719,42 @@ if not filtered_df.empty:
         - El fondo de la fila cambia cuando cambia el valor de espesor.""")
 
 
-    # ... (Your existing code for the dashboard) ...
+    lazy_section('perfora_grid', "Perfil General Perforaciones", render_perfora_grid, inputs={
+        'grid': model.perfora_grid,
+    })
 
-    # --- Perfil Tipo M1, M2, M3 and General Perfil DataFrames ---
-    with st.expander("Perforaciones por Maquina", expanded=False):
-        # Create three columns for M1, M2, and M3
-        col1, col2, col3 = st.columns(3)
 
-        with col1:
-            st.subheader("M1/Perfil")
-            df_perfil_tipoM_m1 = perforaciones_m1.sort_values('perforaTotal',
-                                                                        ascending=False).reset_index(drop=True)
-            # Style the DataFrame
-            df_perfil_tipoM_m1 = df_perfil_tipoM_m1.style.format(precision=2)
-            df_perfil_tipoM_m1 = df_perfil_tipoM_m1.set_table_styles([
-                {'selector': 'th', 'props': [('background-color', '#f0f2f5'), ('font-size', '14px'), ('text-align', 'center')]},
-                {'selector': 'td', 'props': [('font-size', '12px'), ('text-align', 'center')]},
-                {'selector': 'table', 'props': [('border-collapse', 'collapse'), ('width', '100%')]},
-                {'selector': 'th, td', 'props': [('border', '1px solid #ddd'), ('padding', '8px')]}
-            ])
-            st.dataframe(df_perfil_tipoM_m1, height=200, use_container_width=True)
+    # ... (Your existing code for the dashboard) ...
 
-        with col2:
-            st.subheader("M2/Perfil")
-            df_perfil_tipoM_m2 = perforaciones_m2.sort_values('perforaTotal',
-                                                                        ascending=False).reset_index(drop=True)
-            # Apply the same styling and st.dataframe() to df_perfil_tipoM_m2
-            df_perfil_tipoM_m2 = df_perfil_tipoM_m2.style.format(precision=2)
-            df_perfil_tipoM_m2 = df_perfil_tipoM_m2.set_table_styles([
-                {'selector': 'th', 'props': [('background-color', '#f0f2f5'), ('font-size', '14px'), ('text-align', 'center')]},
-                {'selector': 'td', 'props': [('font-size', '12px'), ('text-align', 'center')]},
-                {'selector': 'table', 'props': [('border-collapse', 'collapse'), ('width', '100%')]},
-                {'selector': 'th, td', 'props': [('border', '1px solid #ddd'), ('padding', '8px')]}
-            ])
-            st.dataframe(df_perfil_tipoM_m2, height=200, use_container_width=True)
-
-        with col3:
-            st.subheader("M3/Perfil")
-            df_perfil_tipoM_m3 = perforaciones_m3.sort_values('perforaTotal',
-                                                                        ascending=False).reset_index(drop=True)
-            # Apply the same styling and st.dataframe() to df_perfil_tipoM_m3
-            df_perfil_tipoM_m3 = df_perfil_tipoM_m3.style.format(precision=2)
-            df_perfil_tipoM_m3 = df_perfil_tipoM_m3.set_table_styles([
-                {'selector': 'th', 'props': [('background-color', '#f0f2f5'), ('font-size', '14px'), ('text-align', 'center')]},
-                {'selector': 'td', 'props': [('font-size', '12px'), ('text-align', 'center')]},
-                {'selector': 'table', 'props': [('border-collapse', 'collapse'), ('width', '100%')]},
-                {'selector': 'th, td', 'props': [('border', '1px solid #ddd'), ('padding', '8px')]}
-            ])
-            st.dataframe(df_perfil_tipoM_m3, height=200, use_container_width=True)
+    # --- Perfil Tipo M1, M2, M3 and General Perfil DataFrames ---
+    def render_machine_profiles(profiles):
+        # One column per machine found in the month
+        machines = profiles['machines']
+        if machines:
+            for column, (machine, profile) in zip(st.columns(len(machines)), machines.items()):
+                with column:
+                    st.subheader(f"{machine.upper()}/Perfil")
+                    df_perfil_tipoM_machine = profile.sort_values('perforaTotal',
+                                                                  ascending=False).reset_index(drop=True)
+                    # Style the DataFrame
+                    df_perfil_tipoM_machine = styled_table(df_perfil_tipoM_machine)
+                    st.dataframe(df_perfil_tipoM_machine, height=200, use_container_width=True)
 
         # Create a single column (full width) for "GENERAL PERFIL"
         st.subheader("PERFIL GENERAL")
-        # --- Key Performance Indicators (KPIs) ---
-
 
-        df_perfil_tipoM = group_and_avg(perfora_total, ['tipoMecanizado', 'espesor'],
-                                        'perforaTotal').sort_values('perforaTotal',
-                                                                    ascending=False).reset_index(drop=True)
         # Apply the same styling and st.dataframe() to df_perfil_tipoM_m3
-        df_perfil_tipoM = df_perfil_tipoM.style.format(precision=2)
-        df_perfil_tipoM = df_perfil_tipoM.set_table_styles([
-            {'selector': 'th', 'props': [('background-color', '#f0f2f5'), ('font-size', '14px'), ('text-align', 'center')]},
-            {'selector': 'td', 'props': [('font-size', '12px'), ('text-align', 'center')]},
-            {'selector': 'table', 'props': [('border-collapse', 'collapse'), ('width', '100%')]},
-            {'selector': 'th, td', 'props': [('border', '1px solid #ddd'), ('padding', '8px')]}
-        ])
+        df_perfil_tipoM = styled_table(profiles['general'])
 
 
         st.dataframe(df_perfil_tipoM, height=200, use_container_width=True) # You can choose which DF to show here
 
-# --- Sabimet and Steelk Analysis ---
 
-# Convert the 'espesor' column to Decimal
+    lazy_section('machine_profiles', "Perforaciones por Maquina", render_machine_profiles, inputs={
+        'profiles': lambda: model.machine_profiles(selected_year, selected_month),
+    })
+
+# --- Sabimet and Steelk Analysis ---
 
 
 
@@ -768,94 +812,32 @@ def display_summed_metrics_single_row(prefix, perfo_sum, mm_sum):
     """, unsafe_allow_html=True)
 
 
-# --- Sabimet Analysis ---
-if not filtered_df_sabimet.empty:
-    st.header("Sabimet Analysis")
+def render_business(name, negocio, views):
+    st.header(f"{name} Analysis")
 
-    # Data preprocessing
-    filtered_df_sabimet['espesor'] = filtered_df_sabimet['espesor'].apply(Decimal)
-    filtered_df_sabimet['mm totales'] = filtered_df_sabimet['perforaTotal'].apply(Decimal) * filtered_df_sabimet['espesor']
+    # Display metrics
+    display_summed_metrics_single_row(name, views['perfo_sum'], views['mm_sum'])
 
-    # Calculate metrics
-    perfora_filtered_df_sabimet = filtered_df_sabimet['perforaTotal'].sum()
-    mm_filtered_df_sabimet = filtered_df_sabimet['mm totales'].sum()
+    # Create and display plots, serialized once per month and data version
+    st.plotly_chart(model.business_figure(selected_year, selected_month, negocio, 'placas'))
 
-    # Display metrics
-    display_summed_metrics_single_row("Sabimet", perfora_filtered_df_sabimet, mm_filtered_df_sabimet)
-
-    # Process time analysis
-    columns_to_drop = [
-        'Inicio', 'cantidadPerforacionesTotal', 'Terminado', 'cantidadPerforacionesPlacas',
-        'kg', 'tipoMecanizado', 'progress_createdAt', 'origen', 'maquina', 'placas',
-        'hora_reporte', 'tiempo', 'tiempo_seteo', 'espesor', 'negocio', 'perforaTotal',
-        'Tiempo Proceso (min)'
-    ]
-
-    df_sabimet_process_time = (filtered_df_sabimet
-        .drop_duplicates(subset=['Tiempo Proceso (min)'], keep='first')
-        .assign(Tiempo_Proceso_Dias=lambda x: (x['Tiempo Proceso (min)'] / (60 * 24)).round(2))
-        .drop(columns=columns_to_drop)
-        .groupby('pv', as_index=False)['Tiempo_Proceso_Dias'].sum()
-        .sort_values('Tiempo_Proceso_Dias', ascending=False)
-        .reset_index(drop=True))
-
-    # Group and plot data
-    grouped_df_sabimet = (group_and_sum(filtered_df_sabimet, ['pv', 'espesor'], 'placas')
-        .groupby(['pv', 'espesor'], as_index=False)['placas'].sum()
-        .sort_values('placas', ascending=False)
-        .reset_index(drop=True))
-
-    # Create and display plots
-    fig = bar_plot_with_hover_info(grouped_df_sabimet)
-    st.plotly_chart(fig)
-
-    st.header("Sabimet Procesos")
-    fig = bar_plot_with_hover_process(df_sabimet_process_time)
-    st.plotly_chart(fig)
-else:
-    show_no_data_message("Sabimet", selected_month, selected_year)
-
-# --- Steelk Analysis ---
-if not filtered_df_steelk.empty:
-    st.header("Steelk Analysis")
-
-    # Data preprocessing
-    filtered_df_steelk['espesor'] = filtered_df_steelk['espesor'].apply(Decimal)
-    filtered_df_steelk['mm totales'] = filtered_df_steelk['perforaTotal'].apply(Decimal) * filtered_df_steelk['espesor']
-
-    # Calculate metrics
-    perfo_filtered_df_steelk = filtered_df_steelk['perforaTotal'].sum()
-    mm_filtered_df_steelk = filtered_df_steelk['mm totales'].sum()
+    st.header(f"{name} Procesos")
+    st.plotly_chart(model.business_figure(selected_year, selected_month, negocio, 'proceso'))
 
-    # Display metrics
-    display_summed_metrics_single_row("Steelk", perfo_filtered_df_steelk, mm_filtered_df_steelk)
-    columns_to_drop = [
-        'Inicio', 'cantidadPerforacionesTotal', 'Terminado', 'cantidadPerforacionesPlacas',
-        'kg', 'tipoMecanizado', 'progress_createdAt', 'origen', 'maquina', 'placas',
-        'hora_reporte', 'tiempo', 'tiempo_seteo', 'espesor', 'negocio', 'perforaTotal',
-        'Tiempo Proceso (min)'
-    ]
-    # Process time analysis
-    df_steelk_process_time = (filtered_df_steelk
-        .drop_duplicates(subset=['Tiempo Proceso (min)'], keep='first')
-        .assign(Tiempo_Proceso_Dias=lambda x: (x['Tiempo Proceso (min)'] / (60 * 24)).round(2))
-        .drop(columns=columns_to_drop)
-        .groupby('pv', as_index=False)['Tiempo_Proceso_Dias'].sum()
-        .sort_values('Tiempo_Proceso_Dias', ascending=False)
-        .reset_index(drop=True))
-
-    # Group and plot data
-    grouped_df_steelk = (group_and_sum(filtered_df_steelk, ['pv', 'espesor'], 'placas')
-        .groupby(['pv', 'espesor'], as_index=False)['placas'].sum()
-        .sort_values('placas', ascending=False)
-        .reset_index(drop=True))
-
-    # Create and display plots
-    fig = bar_plot_with_hover_info(grouped_df_steelk)
-    st.plotly_chart(fig)
-
-    st.header("Steelk Procesos")
-    fig = bar_plot_with_hover_process(df_steelk_process_time)
-    st.plotly_chart(fig)
-else:
-    show_no_data_message("Steelk", selected_month, selected_year)
+
+def business_section(name, negocio):
+    if negocio not in month_views['negocios']:
+        return (negocio, lambda: show_no_data_message(name, selected_month, selected_year), None)
+    return (negocio, lambda views: render_business(name, negocio, views), {
+        'views': lambda: model.business_views(selected_year, selected_month, negocio),
+    })
+
+
+# Only the selected business is computed and drawn
+select_section('negocio', 'Negocio', {
+    'Sabimet': business_section("Sabimet", 'sabimet'),
+    'Steelk': business_section("Steelk", 'steelk'),
+})
+
+show_section_timings(st.sidebar)
+show_profiler()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from config import PRICE_RULES, PRICE_DEFAULT_RATE
+
+
+def _rule_order(rule):
+    # Rules applied later override earlier ones: undated before dated, older before newer,
+    # any tipoMecanizado before a specific one
+    desde = rule.get('desde')
+    return (desde is not None, pd.Timestamp(desde) if desde else pd.Timestamp.min,
+            rule.get('tipoMecanizado') is not None)
+
+
+def rate_lookup(df, rules=PRICE_RULES, default=PRICE_DEFAULT_RATE, date_column='Terminado'):
+    """
+    Returns the price per mm for every row of a DataFrame.
+
+    Each rule is applied as a boolean mask over the whole frame, so the cost is one
+    vectorized pass per rule instead of one Python call per row.
+
+    Parameters:
+    - df (pd.DataFrame): Rows with 'negocio' and optionally 'tipoMecanizado' and date_column.
+    - rules (list): Dicts with 'negocio', 'rate' and optional 'tipoMecanizado' and 'desde'.
+    - default (float): Rate for rows no rule matches.
+    - date_column (str): Column compared against 'desde'.
+
+    Returns:
+    - np.ndarray: Rate per row.
+    """
+    rates = np.full(len(df), default, dtype=np.float64)
+    has_tipo = 'tipoMecanizado' in df.columns
+    dates = None
+    if date_column in df.columns and any(rule.get('desde') for rule in rules):
+        dates = df[date_column]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, errors='coerce')
+
+    for rule in sorted(rules, key=_rule_order):
+        # Comparing the Series keeps categorical columns on their integer codes
+        mask = (df['negocio'] == rule['negocio']).to_numpy()
+        if rule.get('tipoMecanizado') is not None:
+            if not has_tipo:
+                continue
+            mask &= (df['tipoMecanizado'] == rule['tipoMecanizado']).to_numpy()
+        if rule.get('desde'):
+            if dates is None:
+                continue
+            mask &= (dates >= pd.Timestamp(rule['desde'])).to_numpy()
+        rates[mask] = rule['rate']
+    return rates
+
+
+def add_cost(df, mm_column='mm de perforado', cost_column='costo', **lookup_kwargs):
+    """Adds cost_column as mm_column times the rate of each row."""
+    df[cost_column] = df[mm_column].to_numpy(dtype=np.float64) * rate_lookup(df, **lookup_kwargs)
+    return df
@@ -0,0 +1,144 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Stages kept for the whole process, including the background refresher's
+MAX_RECORDS = 500
+
+_recent = deque(maxlen=MAX_RECORDS)
+_local = threading.local()
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def _rss_bytes():
+    # Resident set size from /proc; None where it is not available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _rows(value):
+    # Row count of a DataFrame/Series result, or of the first element of a (df, meta) tuple
+    if isinstance(value, (tuple, list)) and value:
+        value = value[0]
+    shape = getattr(value, 'shape', None)
+    return int(shape[0]) if shape else None
+
+
+def _store(record):
+    _recent.append(record)
+    records = getattr(_local, 'records', None)
+    if records is not None:
+        records.append(record)
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Times the enclosed block and records it under name.
+
+    The record holds the wall time, the rows in and out and the change of the process
+    resident memory. Set record['rows_out'] on the yielded record to report the output size.
+    The memory delta is the RSS difference and includes whatever other threads allocated.
+    """
+    depth = getattr(_local, 'depth', 0)
+    record = {
+        'stage': name,
+        'thread': threading.current_thread().name,
+        'depth': depth,
+        'started_at': time.time(),
+        'rows_in': rows_in,
+        'rows_out': None,
+    }
+    rss = _rss_bytes()
+    _local.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        _local.depth = depth
+        end_rss = _rss_bytes()
+        record['memory_delta_bytes'] = end_rss - rss if rss is not None and end_rss is not None else None
+        _store(record)
+
+
+def record_stage(name, seconds, rows_in=None, rows_out=None):
+    """Records a stage measured by the caller, e.g. time accumulated over several pages."""
+    _store({
+        'stage': name,
+        'thread': threading.current_thread().name,
+        'depth': getattr(_local, 'depth', 0),
+        'started_at': time.time() - seconds,
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+        'seconds': seconds,
+        'memory_delta_bytes': None,
+    })
+
+
+def timed(name):
+    """
+    Decorator that runs the function inside stage(name).
+
+    Rows in are taken from the first positional argument and rows out from the result,
+    when they are DataFrames (or a tuple starting with one).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name, rows_in=_rows(args[0]) if args else None) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = _rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def begin_run():
+    """Starts collecting the stages of the current thread, e.g. one Streamlit rerun."""
+    _local.records = []
+    _local.depth = 0
+
+
+def run_records():
+    """Stages recorded by the current thread since begin_run, in completion order."""
+    return list(getattr(_local, 'records', None) or [])
+
+
+def recent_records(thread=None):
+    """Stages kept for the process, optionally only those of one thread name."""
+    return [record for record in list(_recent) if thread is None or record['thread'] == thread]
+
+
+def records_json(records):
+    """Serializes records for download."""
+    return json.dumps(records, indent=2, default=str)
+
+
+def start_capture():
+    """Starts a cProfile capture of the current thread."""
+    profile = cProfile.Profile()
+    profile.enable()
+    return profile
+
+
+def capture_report(profile, limit=40):
+    """Stops a capture from start_capture and returns its top functions by cumulative time."""
+    profile.disable()
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
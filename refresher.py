@@ -0,0 +1,109 @@
+import threading
+import time
+
+
+class DataRefresher:
+    """
+    Keeps the shared dataset up to date from a background thread.
+
+    sync(on_progress=None) is called every interval seconds and must return
+    (df, meta) like database.sync_snapshot. When a sync changes the data, the
+    frame, its month index and its rollup are swapped in together, meta['version']
+    moves forward and on_update(meta) is called so derived views can be invalidated.
+    update_rollup(previous, df, month_index, touched_months) maintains the rollup
+    incrementally; previous is None on the first load.
+    Readers take the current state with current() and only wait for the first load.
+    """
+
+    def __init__(self, sync, build_index, interval, on_update=None, update_rollup=None):
+        self.interval = interval
+        self._sync = sync
+        self._build_index = build_index
+        self._on_update = on_update
+        self._update_rollup = update_rollup
+        self._state_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.df = None
+        self.month_index = None
+        self.rollup = None
+        self.meta = {}
+        self.last_refresh = None
+        self.last_error = None
+
+    @property
+    def version(self):
+        return self.meta.get('version', 0)
+
+    def current(self):
+        """Returns (df, month_index, meta, rollup) of the last successful sync."""
+        with self._state_lock:
+            return self.df, self.month_index, self.meta, self.rollup
+
+    def ensure_loaded(self, on_progress=None):
+        """
+        Runs the first sync in the calling thread if needed and starts the background thread.
+
+        Once the data is loaded no lock is taken, so a rerun never waits for a
+        background refresh that is in progress.
+        """
+        if self.df is None:
+            with self._sync_lock:
+                # Another session may have finished the first load while this one waited
+                if self.df is None:
+                    self._refresh(on_progress)
+        self.start()
+
+    def refresh(self, on_progress=None):
+        """Syncs now. Returns True when the data changed."""
+        with self._sync_lock:
+            return self._refresh(on_progress)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='data-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        lag = None if self.last_refresh is None else time.time() - self.last_refresh
+        return {
+            'version': self.version,
+            'last_refresh': self.last_refresh,
+            'lag_seconds': lag,
+            'last_error': self.last_error,
+            'running': self._thread is not None and self._thread.is_alive(),
+        }
+
+    def _refresh(self, on_progress):
+        try:
+            df, meta = self._sync(on_progress=on_progress)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            raise
+        changed = self.df is None or bool(meta.get('touched_months'))
+        if changed:
+            month_index = self._build_index(df)
+            rollup = None
+            if self._update_rollup is not None:
+                previous = None if self.df is None else self.rollup
+                rollup = self._update_rollup(previous, df, month_index, meta.get('touched_months', []))
+            with self._state_lock:
+                self.df, self.month_index, self.meta, self.rollup = df, month_index, meta, rollup
+            if self._on_update is not None:
+                self._on_update(meta)
+        self.last_refresh = time.time()
+        self.last_error = None
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                # The error is kept in last_error and the previous data stays in use
+                pass
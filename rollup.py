@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+from fixed_point import MICROMETRES_PER_MM, decimal_mm, mm_micrometres
+from profiling import timed
+
+# Grain of the rollup. 'origen' is kept because the machine KPIs only count 'Progreso' reports
+# while the per-business totals count every report.
+ROLLUP_KEYS = ['year', 'month', 'day', 'maquina', 'negocio', 'origen', 'tipoMecanizado', 'espesor']
+
+# Key columns stored as categoricals
+_CATEGORICAL_KEYS = ['maquina', 'negocio', 'origen', 'tipoMecanizado']
+
+
+@timed('rollup.build_rollup')
+def build_rollup(df):
+    """
+    Aggregates progress rows to the ROLLUP_KEYS grain.
+
+    Parameters:
+    - df (pd.DataFrame): Rows built by create_dataframe_from_items.
+
+    Returns:
+    - pd.DataFrame: One row per key with 'perforaciones' (sum of perforaTotal), 'mm_um'
+      (perforated length in integer micrometres) and 'reportes' (number of rows).
+    """
+    terminado = df['Terminado']
+    frame = pd.DataFrame({
+        'year': terminado.dt.year,
+        'month': terminado.dt.month,
+        'day': terminado.dt.day,
+        'maquina': df['maquina'],
+        'negocio': df['negocio'],
+        'origen': df['origen'],
+        'tipoMecanizado': df['tipoMecanizado'],
+        'espesor': df['espesor'],
+        'perforaciones': df['perforaTotal'],
+        'mm_um': mm_micrometres(df['perforaTotal'], df['espesor']),
+        'reportes': np.ones(len(df), dtype=np.int64),
+    })
+    rollup = frame.groupby(ROLLUP_KEYS, observed=True, dropna=False, as_index=False).sum()
+    return _encode(rollup)
+
+
+@timed('rollup.update_rollup')
+def update_rollup(rollup, df, month_index, touched_months):
+    """
+    Rebuilds the rollup rows of the months a sync touched and keeps the others.
+
+    Parameters:
+    - rollup (pd.DataFrame): Previous rollup, or None to build it from the whole df.
+    - df (pd.DataFrame): The synced DataFrame.
+    - month_index (dict): build_month_index(df).
+    - touched_months (list): 'YYYY-MM' keys from the sync metadata.
+
+    Returns:
+    - pd.DataFrame: The updated rollup.
+    """
+    if rollup is None:
+        return build_rollup(df)
+    if not touched_months:
+        return rollup
+
+    touched = [(int(key[:4]), int(key[5:7])) for key in touched_months]
+    keep = ~(rollup['year'] * 100 + rollup['month']).isin([year * 100 + month for year, month in touched])
+    positions = [month_index[key]['all'] for key in touched if key in month_index]
+    fresh = build_rollup(df.iloc[np.concatenate(positions)]) if positions else rollup.iloc[:0]
+    updated = pd.concat([rollup[keep], fresh], ignore_index=True)
+    return _encode(updated.sort_values(['year', 'month', 'day'], kind='stable', ignore_index=True))
+
+
+def select_month(rollup, year, month, origen=None, negocio=None):
+    """Returns the rollup rows of a month, optionally for one origen and one negocio."""
+    mask = (rollup['year'] == year) & (rollup['month'] == month)
+    if origen is not None:
+        mask &= rollup['origen'] == origen
+    if negocio is not None:
+        mask &= rollup['negocio'] == negocio
+    return rollup[mask]
+
+
+def machine_metrics(rows):
+    """
+    KPIs of every machine present in the given rollup rows.
+
+    Returns:
+    - pd.DataFrame: Indexed by maquina, with 'avg_mm' (mm per report), 'total_mm',
+      'reportes' and 'perforaciones'.
+    """
+    grouped = rows.groupby('maquina', observed=True)[['mm_um', 'reportes', 'perforaciones']].sum()
+    total_mm = grouped['mm_um'] / MICROMETRES_PER_MM
+    return pd.DataFrame({
+        'avg_mm': total_mm / grouped['reportes'],
+        'total_mm': total_mm,
+        'reportes': grouped['reportes'],
+        'perforaciones': grouped['perforaciones'],
+    })
+
+
+def perforation_profile(rows, group_columns=('tipoMecanizado', 'espesor')):
+    """Sums perforations by group_columns, named and rounded like group_and_sum(..., 'perforaTotal')."""
+    grouped = rows.groupby(list(group_columns), as_index=False, observed=True)['perforaciones'].sum()
+    grouped['perforaciones'] = grouped['perforaciones'].round(2)
+    return grouped.rename(columns={'perforaciones': 'perforaTotal'})
+
+
+def machine_profiles(rows):
+    """Returns {maquina: perforation_profile of that machine} for the machines in rows."""
+    grouped = perforation_profile(rows, ['maquina', 'tipoMecanizado', 'espesor'])
+    return {machine: profile.drop(columns='maquina').reset_index(drop=True)
+            for machine, profile in grouped.groupby('maquina', observed=True)}
+
+
+def business_totals(rows):
+    """Returns (perforations, exact Decimal mm) for the given rollup rows."""
+    return rows['perforaciones'].sum(), decimal_mm(rows['mm_um'].sum())
+
+
+def last_months(year, month, count):
+    """Returns the count months ending at (year, month), oldest first, as (year, month) tuples."""
+    index = year * 12 + month - 1
+    return [((i // 12), (i % 12) + 1) for i in range(index - count + 1, index + 1)]
+
+
+def year_over_year(year, month):
+    """Returns the same month of the previous year and the month itself."""
+    return [(year - 1, month), (year, month)]
+
+
+def _select_periods(rollup, periods, origen=None):
+    period = rollup['year'] * 100 + rollup['month']
+    mask = period.isin([year * 100 + month for year, month in periods])
+    if origen is not None:
+        mask &= rollup['origen'] == origen
+    return rollup[mask]
+
+
+def _with_period_label(grouped):
+    grouped.insert(0, 'periodo', [f"{int(year)}-{int(month):02d}"
+                                  for year, month in zip(grouped['year'], grouped['month'])])
+    return grouped.drop(columns=['year', 'month'])
+
+
+def monthly_machine_metrics(rollup, periods):
+    """
+    Machine KPIs for several months in one groupby over the rollup.
+
+    Returns:
+    - pd.DataFrame: One row per (periodo, maquina) with the columns of machine_metrics.
+    """
+    rows = _select_periods(rollup, periods, origen='Progreso')
+    grouped = (rows.groupby(['year', 'month', 'maquina'], observed=True, as_index=False)
+               [['mm_um', 'reportes', 'perforaciones']].sum())
+    grouped['total_mm'] = grouped['mm_um'] / MICROMETRES_PER_MM
+    grouped['avg_mm'] = grouped['total_mm'] / grouped['reportes']
+    grouped = grouped[['year', 'month', 'maquina', 'avg_mm', 'total_mm', 'reportes', 'perforaciones']]
+    return _with_period_label(grouped)
+
+
+def monthly_business_totals(rollup, periods, negocios=('sabimet', 'steelk')):
+    """
+    Perforations and mm per business for several months in one groupby over the rollup.
+
+    Returns:
+    - pd.DataFrame: One row per (periodo, negocio) with 'perforaciones' and 'total_mm'.
+    """
+    rows = _select_periods(rollup, periods)
+    rows = rows[rows['negocio'].isin(negocios)]
+    grouped = (rows.groupby(['year', 'month', 'negocio'], observed=True, as_index=False)
+               [['perforaciones', 'mm_um']].sum())
+    grouped['total_mm'] = grouped['mm_um'] / MICROMETRES_PER_MM
+    return _with_period_label(grouped.drop(columns='mm_um'))
+
+
+def _encode(rollup):
+    # pd.concat falls back to object when categories differ
+    for col in _CATEGORICAL_KEYS:
+        rollup[col] = rollup[col].astype('category')
+    return rollup
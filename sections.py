@@ -0,0 +1,106 @@
+import time
+
+import streamlit as st
+
+from profiling import stage
+
+# Last measured cost of every section in this process. Sessions that keep a section
+# closed use it to report how much work the rerun skipped.
+_last_seconds = {}
+
+
+def reset_section_timings():
+    """Starts a new rerun's record in st.session_state['section_timings']."""
+    st.session_state['section_timings'] = {}
+
+
+def run_section(key, render, inputs=None):
+    """
+    Computes the inputs of a section and renders it, timing both steps.
+
+    Parameters:
+    - key (str): Name of the section in the timings.
+    - render (callable): Draws the section, called with the inputs as keyword arguments.
+    - inputs (dict): name -> callable producing that input.
+    """
+    with stage(f'section.{key}'):
+        start = time.perf_counter()
+        values = {name: compute() for name, compute in (inputs or {}).items()}
+        computed = time.perf_counter()
+        render(**values)
+        end = time.perf_counter()
+    _last_seconds[key] = end - start
+    st.session_state.setdefault('section_timings', {})[key] = {
+        'rendered': True,
+        'compute_seconds': computed - start,
+        'render_seconds': end - computed,
+        'seconds': end - start,
+    }
+
+
+def skip_section(key):
+    """Records a section that was not rendered, with its last measured cost when there is one."""
+    st.session_state.setdefault('section_timings', {})[key] = {
+        'rendered': False,
+        'seconds': 0.0,
+        'skipped_seconds': _last_seconds.get(key),
+    }
+
+
+def lazy_section(key, label, render, inputs=None, default_open=False):
+    """
+    Renders a dashboard block only while its toggle is on.
+
+    The toggle state lives in st.session_state['section_<key>'], so a closed section
+    costs nothing on a rerun: its inputs are neither computed nor serialized.
+
+    Parameters:
+    - key (str): Name of the section.
+    - label (str): Toggle label.
+    - render (callable): Draws the section, called with the inputs as keyword arguments.
+    - inputs (dict): name -> callable producing that input, only called when open.
+    - default_open (bool): Toggle state of a new session.
+
+    Returns:
+    - bool: Whether the section was rendered.
+    """
+    if not st.toggle(label, value=default_open, key=f'section_{key}'):
+        skip_section(key)
+        return False
+    with st.container():
+        run_section(key, render, inputs)
+    return True
+
+
+def select_section(key, label, sections):
+    """
+    Shows a horizontal selector and renders only the chosen section.
+
+    Parameters:
+    - key (str): The choice lives in st.session_state['section_<key>'].
+    - label (str): Selector label.
+    - sections (dict): Option label -> (section key, render, inputs).
+
+    Returns:
+    - str: The chosen option.
+    """
+    choice = st.radio(label, list(sections), horizontal=True, key=f'section_{key}')
+    for option, (section_key, render, inputs) in sections.items():
+        if option == choice:
+            run_section(section_key, render, inputs)
+        else:
+            skip_section(section_key)
+    return choice
+
+
+def show_section_timings(container):
+    """Summarizes the rendered and skipped sections of the current rerun in container."""
+    timings = st.session_state.get('section_timings', {})
+    if not timings:
+        return
+    rendered = [t for t in timings.values() if t['rendered']]
+    skipped = [t for t in timings.values() if not t['rendered']]
+    rendered_ms = 1000 * sum(t['seconds'] for t in rendered)
+    skipped_ms = 1000 * sum(t['skipped_seconds'] or 0 for t in skipped)
+    container.caption(f"Secciones: {len(rendered)} mostradas en {rendered_ms:.0f} ms, "
+                      f"{len(skipped)} omitidas (~{skipped_ms:.0f} ms ahorrados)")
@@ -0,0 +1,64 @@
+import numpy as np
+
+from profiling import timed
+from util_functions import format_perfora_grid
+
+# Shared look of the tables shown with st.dataframe
+TABLE_STYLES = [
+    {'selector': 'th', 'props': [('background-color', '#f0f2f5'), ('font-size', '14px'), ('text-align', 'center')]}, # Style headers
+    {'selector': 'td', 'props': [('font-size', '12px'), ('text-align', 'center')]}, # Style cells
+    {'selector': 'table', 'props': [('border-collapse', 'collapse'), ('width', '100%')]}, # Style table
+    {'selector': 'th, td', 'props': [('border', '1px solid #ddd'), ('padding', '8px')]} # Add borders and padding
+]
+
+CELL_CSS = 'color: black; text-align: center;'
+MISSING_CSS = 'background-color: lightcoral; ' + CELL_CSS
+HIGH_CSS = 'background-color: lightgreen; ' + CELL_CSS
+BAND_CSS = ('background-color: lightgrey; ' + CELL_CSS, 'background-color: white; ' + CELL_CSS)
+
+# Cells whose maximum perforations exceed this value are highlighted
+HIGH_PERFORA = 100
+
+
+def styled_table(df, precision=2):
+    """Returns a Styler for df with numbers formatted to precision and the shared TABLE_STYLES."""
+    return df.style.format(precision=precision).set_table_styles(TABLE_STYLES)
+
+
+def espesor_bands(espesor):
+    """
+    Returns the band CSS of every row, alternating each time espesor changes.
+
+    The band is the parity of the cumulative count of changes, so the whole column
+    is classified with NumPy instead of a loop over the rows.
+    """
+    espesor = np.asarray(espesor)
+    changes = np.ones(len(espesor), dtype=bool)
+    changes[1:] = espesor[1:] != espesor[:-1]
+    return np.asarray(BAND_CSS)[np.cumsum(changes) % 2]
+
+
+def perfora_grid_css(grid):
+    """
+    CSS of every cell of the perfora grid.
+
+    Parameters:
+    - grid (pd.DataFrame): Numeric grid from create_perfora_grid.
+
+    Returns:
+    - np.ndarray: One CSS string per cell; the missing/high highlight comes first and
+      the espesor band is appended after it.
+    """
+    max_values = grid['maxPerfora'].to_numpy(dtype=float)
+    highlight = np.where(np.isnan(max_values), MISSING_CSS,
+                         np.where(max_values > HIGH_PERFORA, HIGH_CSS, CELL_CSS))
+    bands = espesor_bands(grid.index.get_level_values('espesor'))
+    return np.char.add(np.char.add(highlight, ' '), bands[:, np.newaxis])
+
+
+@timed('styling.style_perfora_grid')
+def style_perfora_grid(grid):
+    """Returns the Styler of the perfora grid: '(max,avg)' text cells, highlights and espesor bands."""
+    cells = format_perfora_grid(grid)
+    css = perfora_grid_css(grid)
+    return styled_table(cells).apply(lambda _: css, axis=None)
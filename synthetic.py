@@ -0,0 +1,144 @@
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+# Value pools of the generated items, close to what the MecanizadoClose table holds
+MACHINES = ['m1', 'm2', 'm3']
+NEGOCIOS = ['sabimet', 'steelk']
+TIPOS_MECANIZADO = ['perfil', 'placa', 'angulo']
+ESPESORES = ['0.8', '6', '8', '10', '12.5', '16', '20']
+ORIGENES = ['Progreso', 'Progreso', 'Progreso', 'Seteo']
+
+# Items are drawn in chunks so the random numbers come from NumPy, not one call per field
+_CHUNK = 10000
+
+
+def generate_items(n_items, seed=0, start=datetime(2024, 10, 1), days=365, max_progress=4,
+                   missing_espesor=0.05):
+    """
+    Yields synthetic items shaped like the DynamoDB records create_dataframe_from_items reads.
+
+    Items are produced lazily, so millions of progress rows can be streamed through
+    ingest_pages without holding the raw items. The same seed gives the same items.
+
+    Parameters:
+    - n_items (int): Number of items. Each has 1..max_progress progress entries.
+    - seed (int): Seed of the random generator.
+    - start (datetime): First possible 'timestamp'.
+    - days (int): Span of the 'timestamp' values after start.
+    - max_progress (int): Largest number of progress entries per item.
+    - missing_espesor (float): Share of items without 'espesor', which the flattening
+      fills with 0.
+
+    Yields:
+    - dict: {'pv', 'posicion', 'timestamp', 'data': {..., 'progress': [...]}} with
+      Decimal numbers, like boto3 returns them.
+    """
+    rng = np.random.default_rng(seed)
+    minutes = days * 24 * 60
+    for offset in range(0, n_items, _CHUNK):
+        size = min(_CHUNK, n_items - offset)
+        finished = rng.integers(0, minutes, size)
+        duration = rng.integers(10, 6000, size)
+        n_progress = rng.integers(1, max_progress + 1, size)
+        perforaciones_total = rng.integers(1, 500, size)
+        perforaciones_placas = rng.integers(1, 50, size)
+        kg = np.round(rng.random(size) * 100, 1)
+        tipo = rng.integers(0, len(TIPOS_MECANIZADO), size)
+        negocio = rng.integers(0, len(NEGOCIOS), size)
+        cliente = rng.integers(1, 40, size)
+        espesor = rng.integers(0, len(ESPESORES), size)
+        has_espesor = rng.random(size) >= missing_espesor
+
+        n_rows = int(n_progress.sum())
+        origen = rng.integers(0, len(ORIGENES), n_rows)
+        maquina = rng.integers(0, len(MACHINES), n_rows)
+        placas = rng.integers(1, 20, n_rows)
+        tiempo = rng.integers(1, 100, n_rows)
+        tiempo_seteo = rng.integers(1, 20, n_rows)
+        has_seteo = rng.random(n_rows) < 0.5
+
+        row = 0
+        for i in range(size):
+            index = offset + i
+            terminado = start + timedelta(minutes=int(finished[i]))
+            inicio = terminado - timedelta(minutes=int(duration[i]))
+            progress = []
+            for j in range(n_progress[i]):
+                entry = {
+                    'createdAt': (inicio + timedelta(minutes=30 * j)).isoformat(),
+                    'origen': ORIGENES[origen[row]],
+                    'maquina': MACHINES[maquina[row]],
+                    'placas': Decimal(int(placas[row])),
+                    'hora_reporte': f"{8 + j:02d}:00",
+                    'tiempo': Decimal(int(tiempo[row])),
+                }
+                if has_seteo[row]:
+                    entry['tiempo_seteo'] = Decimal(int(tiempo_seteo[row]))
+                progress.append(entry)
+                row += 1
+
+            data = {
+                'createdAt': inicio.isoformat(),
+                'cantidadPerforacionesTotal': Decimal(int(perforaciones_total[i])),
+                'cantidadPerforacionesPlacas': Decimal(int(perforaciones_placas[i])),
+                'kg': Decimal(str(kg[i])),
+                'tipoMecanizado': TIPOS_MECANIZADO[tipo[i]],
+                'cliente': f"c{cliente[i]}",
+                'negocio': NEGOCIOS[negocio[i]],
+                'progress': progress,
+            }
+            if has_espesor[i]:
+                data['espesor'] = Decimal(ESPESORES[espesor[i]])
+            yield {
+                'pv': f"PV{index // 2:06d}",
+                'posicion': str(index % 2),
+                'timestamp': terminado.isoformat(),
+                'data': data,
+            }
+
+
+def make_items(n_items, **kwargs):
+    """Returns generate_items(n_items, **kwargs) as a list."""
+    return list(generate_items(n_items, **kwargs))
+
+
+class SyntheticTable:
+    """
+    Stands in for the boto3 Table in database.sync_snapshot.
+
+    scan() pages through the given items and honours Segment/TotalSegments,
+    ExclusiveStartKey and a FilterExpression of the form Attr('timestamp').gte(value).
+    Every call sleeps latency seconds, like the round trip of a DynamoDB page, so
+    parallel scans overlap their waits the way they do against the real table.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, items, page_size=1000, latency=0.0):
+        self.items = items
+        self.page_size = page_size
+        self.latency = latency
+        self.scans = 0
+
+    def scan(self, ExclusiveStartKey=None, FilterExpression=None, Segment=None, TotalSegments=None, **kwargs):
+        self.scans += 1
+        if self.latency:
+            time.sleep(self.latency)
+        segment, total = (Segment, TotalSegments) if Segment is not None else (0, 1)
+        start = ExclusiveStartKey['offset'] if ExclusiveStartKey else 0
+        if FilterExpression is None:
+            # The page is sliced straight from the items, so large tables are not copied on every call
+            n_items = len(range(segment, len(self.items), total))
+            page = self.items[segment + start * total:segment + (start + self.page_size) * total:total]
+        else:
+            low = FilterExpression.get_expression()['values'][1]
+            items = [item for item in self.items[segment::total] if item['timestamp'] >= low]
+            n_items = len(items)
+            page = items[start:start + self.page_size]
+        result = {'Items': page}
+        if start + self.page_size < n_items:
+            result['LastEvaluatedKey'] = {'offset': start + self.page_size}
+        return result
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from util_functions import aggregate_with_attributes
+
+
+def test_sums_and_attributes_follow_their_group():
+    df = pd.DataFrame({
+        'pv': pd.Categorical(['b', 'a', 'b', 'c', 'a', None], categories=['c', 'b', 'a']),
+        'posicion': ['1', '0', '1', '0', '0', '0'],
+        'placas': [1, 2, 3, 4, 5, 6],
+        'perforaTotal': [10.0, 20.0, 30.0, 40.0, 50.0, 60.0],
+        'cliente': ['x', 'y', 'z', 'w', 'v', 'u'],
+    })
+    grouped = aggregate_with_attributes(df, ['pv', 'posicion'], ['placas', 'perforaTotal'], ['cliente'])
+
+    # Groups come in groupby order (category order), rows with a missing key are dropped
+    assert grouped['pv'].tolist() == ['c', 'b', 'a']
+    assert grouped['placas'].tolist() == [4, 4, 7]
+    assert grouped['perforaTotal'].tolist() == [40.0, 40.0, 70.0]
+    # Attributes come from the first row of each group
+    assert grouped['cliente'].tolist() == ['w', 'x', 'y']
+    assert list(grouped.columns) == ['pv', 'posicion', 'placas', 'perforaTotal', 'cliente']
+
+
+def test_sums_are_rounded():
+    df = pd.DataFrame({'pv': ['a', 'a'], 'kg': [0.114, 0.002], 'espesor': [8.0, 10.0]})
+    grouped = aggregate_with_attributes(df, ['pv'], ['kg'], ['espesor'])
+    np.testing.assert_array_equal(grouped['kg'], [0.12])
+    assert grouped['espesor'].tolist() == [8.0]
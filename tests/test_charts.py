@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from charts import OTHERS_LABEL, pv_placas_figure, pv_process_figure
+
+
+def pv_frame(n_pv):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'pv': [f"PV{i:04d}" for i in range(n_pv)],
+        'espesor': rng.choice([3.0, 6.0, 10.0], n_pv),
+        'placas': rng.integers(1, 100, n_pv),
+        'Tiempo_Proceso_Dias': rng.random(n_pv).round(2),
+    })
+
+
+def test_default_charts_fold_small_pvs_into_bars():
+    df = pv_frame(800)
+    for fig in (pv_placas_figure(df), pv_process_figure(df)):
+        trace, = fig.data
+        assert isinstance(trace, go.Bar)
+        assert len(trace.x) == 51
+        assert trace.x[-1] == f"{OTHERS_LABEL} (750 PV)"
+
+
+def test_every_pv_past_webgl_points_is_drawn_with_webgl():
+    df = pv_frame(800)
+    fig = pv_placas_figure(df, max_bars=None)
+    trace, = fig.data
+    assert isinstance(trace, go.Scattergl)
+    assert len(trace.x) == 800
+    # The espesor annotation moves to the hover
+    assert list(trace.customdata) == df['espesor'].tolist()
+    assert '%{customdata}' in trace.hovertemplate
+
+    trace, = pv_process_figure(df, max_bars=None).data
+    assert isinstance(trace, go.Scattergl)
+    assert len(trace.x) == 800
+
+    # Up to webgl_points every PV is still a bar
+    trace, = pv_placas_figure(df.iloc[:500], max_bars=None).data
+    assert isinstance(trace, go.Bar)
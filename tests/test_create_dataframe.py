@@ -0,0 +1,28 @@
+import numpy as np
+
+from synthetic import make_items
+from util_functions import create_dataframe_from_items
+
+
+def test_null_numbers_become_nan():
+    items = make_items(20, seed=3)
+    # DynamoDB NULL attributes come back from boto3 as None
+    items[0]['data']['kg'] = None
+    items[1]['data']['cantidadPerforacionesTotal'] = None
+    items[2]['data']['espesor'] = None
+    items[3]['data']['progress'][0]['placas'] = None
+    df = create_dataframe_from_items(items)
+
+    first_rows = np.cumsum([0] + [len(item['data']['progress']) for item in items])
+    assert np.isnan(df['kg'].iloc[first_rows[0]])
+    assert np.isnan(df['cantidadPerforacionesTotal'].iloc[first_rows[1]])
+    assert np.isnan(df['espesor'].iloc[first_rows[2]])
+    assert np.isnan(df['placas'].iloc[first_rows[3]])
+    assert df['kg'].iloc[first_rows[1]:].notna().all()
+
+
+def test_decimal_numbers_are_converted():
+    items = make_items(20, seed=3)
+    df = create_dataframe_from_items(items)
+    assert df['kg'].iloc[0] == np.float32(items[0]['data']['kg'])
+    assert df['espesor'].dtype == np.float64
@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from exports import month_export_frames
+from fixed_point import decimal_mm, mm_micrometres, perforated_mm
+from rollup import build_rollup, business_totals, select_month
+from synthetic import make_items
+from util_functions import build_month_index, create_dataframe_from_items
+
+
+def decimal_total(df):
+    # The Sabimet/Steelk total as main.py computed it before the micrometre path
+    espesor = df['espesor'].apply(Decimal)
+    return (df['perforaTotal'].apply(Decimal) * espesor).sum()
+
+
+def synthetic_frame(n_items=3000):
+    return create_dataframe_from_items(make_items(n_items, seed=1))
+
+
+def test_perforated_mm_matches_decimal_rows():
+    df = synthetic_frame()
+    expected = [float(round(Decimal(p) * Decimal(e), 3)) for p, e in zip(df['perforaTotal'], df['espesor'])]
+    np.testing.assert_array_equal(perforated_mm(df['perforaTotal'], df['espesor']), expected)
+
+
+def test_business_totals_match_decimal_totals():
+    df = synthetic_frame()
+    rollup = build_rollup(df)
+    month_index = build_month_index(df)
+    checked = 0
+    for year, month in month_index:
+        month_df = df[(df['Terminado'].dt.year == year) & (df['Terminado'].dt.month == month)]
+        for negocio in ('sabimet', 'steelk'):
+            rows = month_df[month_df['negocio'] == negocio]
+            perfo_sum, mm_sum = business_totals(select_month(rollup, year, month, negocio=negocio))
+            assert perfo_sum == rows['perforaTotal'].sum()
+            # The cards show round(mm_sum, 2)
+            assert round(mm_sum, 2) == round(decimal_total(rows), 2)
+            checked += 1
+    assert checked > 10
+
+
+def test_half_cent_total_is_exact():
+    # 0.005 mm is not exact in binary: Decimal(0.005) is slightly above the half cent
+    df = pd.DataFrame({'perforaTotal': [1.0], 'espesor': [0.005]})
+    mm_sum = decimal_mm(mm_micrometres(df['perforaTotal'], df['espesor']).sum())
+    assert mm_sum == Decimal('0.005')
+    assert round(mm_sum, 2) == Decimal('0.00')
+    assert round(decimal_total(df), 2) == Decimal('0.01')
+
+
+def test_decimal_mm_has_three_decimals():
+    assert decimal_mm(1234567) == Decimal('1234.567')
+    assert str(decimal_mm(np.int64(5000))) == '5.000'
+
+
+def test_missing_numbers_are_skipped():
+    items = make_items(200, seed=2)
+    # DynamoDB NULLs flatten to NaN and must not turn into INT64_MIN
+    items[4]['data']['espesor'] = None
+    items[2]['data']['progress'][2]['placas'] = None
+    items[1]['data']['cantidadPerforacionesPlacas'] = None
+    df = create_dataframe_from_items(items)
+    valid = df['perforaTotal'].notna() & df['espesor'].notna()
+    assert not valid.all()
+
+    rollup = build_rollup(df)
+    assert rollup['mm_um'].min() >= 0
+    perfo_sum, mm_sum = business_totals(rollup)
+    assert perfo_sum == df['perforaTotal'].sum()
+    assert round(mm_sum, 2) == round(decimal_total(df[valid]), 2)
+
+    resumen, total = month_export_frames(df)
+    for table in (resumen, total):
+        for col in ('mm de perforado', 'costo'):
+            assert not (table[col] < 0).any()
+    missing = total['espesor'].isna()
+    assert missing.any()
+    assert total.loc[missing, 'mm de perforado'].isna().all()
+    assert total.loc[~missing, 'mm de perforado'].notna().all()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from pricing import add_cost, rate_lookup
+
+RULES = [
+    {'negocio': 'sabimet', 'rate': 200},
+    {'negocio': 'sabimet', 'tipoMecanizado': 'perfil', 'rate': 250},
+    {'negocio': 'sabimet', 'desde': '2024-03-15', 'rate': 220},
+    {'negocio': 'sabimet', 'desde': '2024-06-01', 'rate': 230},
+    {'negocio': 'sabimet', 'tipoMecanizado': 'perfil', 'desde': '2024-06-01', 'rate': 260},
+    {'negocio': 'steelk', 'rate': 100},
+]
+
+
+def priced(rows):
+    df = pd.DataFrame(rows, columns=['negocio', 'tipoMecanizado', 'Terminado'])
+    df['Terminado'] = pd.to_datetime(df['Terminado'])
+    return rate_lookup(df, rules=RULES, default=1)
+
+
+def test_undated_rules_and_default():
+    rates = priced([
+        ('sabimet', 'placa', '2024-01-10'),
+        ('sabimet', 'perfil', '2024-01-10'),
+        ('steelk', 'perfil', '2024-08-01'),
+        ('otro', 'placa', '2024-08-01'),
+    ])
+    np.testing.assert_array_equal(rates, [200, 250, 100, 1])
+
+
+def test_latest_dated_rule_wins_from_its_date():
+    rates = priced([
+        ('sabimet', 'placa', '2024-03-14'),
+        ('sabimet', 'placa', '2024-03-15'),
+        ('sabimet', 'placa', '2024-05-31'),
+        ('sabimet', 'placa', '2024-06-01'),
+    ])
+    np.testing.assert_array_equal(rates, [200, 220, 220, 230])
+
+
+def test_date_ranks_above_tipo():
+    rates = priced([
+        # An undated perfil rule loses to any dated rule that matches
+        ('sabimet', 'perfil', '2024-03-14'),
+        ('sabimet', 'perfil', '2024-03-15'),
+        # With the same 'desde' the perfil rule wins over the generic one
+        ('sabimet', 'perfil', '2024-06-01'),
+    ])
+    np.testing.assert_array_equal(rates, [250, 220, 260])
+
+
+def test_rule_order_does_not_matter():
+    df = pd.DataFrame({'negocio': ['sabimet'] * 3, 'tipoMecanizado': ['perfil', 'placa', 'perfil'],
+                       'Terminado': pd.to_datetime(['2024-01-01', '2024-04-01', '2024-07-01'])})
+    np.testing.assert_array_equal(rate_lookup(df, rules=RULES[::-1], default=1),
+                                  rate_lookup(df, rules=RULES, default=1))
+
+
+def test_add_cost_uses_the_rate_of_each_row():
+    df = pd.DataFrame({'negocio': pd.Categorical(['sabimet', 'steelk']), 'tipoMecanizado': ['placa', 'placa'],
+                       'Terminado': pd.to_datetime(['2024-01-01', '2024-01-01']),
+                       'mm de perforado': [2.0, np.nan]})
+    add_cost(df, rules=RULES, default=1)
+    assert df['costo'].iloc[0] == 400
+    assert np.isnan(df['costo'].iloc[1])
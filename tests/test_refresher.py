@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pandas as pd
+
+from refresher import DataRefresher
+
+
+def make_refresher(sync):
+    return DataRefresher(sync, lambda df: {}, interval=3600)
+
+
+def test_ensure_loaded_does_not_wait_for_a_background_refresh():
+    release = threading.Event()
+    syncing = threading.Event()
+    calls = []
+
+    def sync(on_progress=None):
+        calls.append(time.perf_counter())
+        if len(calls) > 1:
+            # Later syncs stand for a slow DynamoDB scan
+            syncing.set()
+            release.wait(5)
+        return pd.DataFrame({'a': [len(calls)]}), {'touched_months': ['2025-01']}
+
+    refresher = make_refresher(sync)
+    refresher.ensure_loaded()
+    refresh = threading.Thread(target=refresher.refresh)
+    refresh.start()
+    try:
+        assert syncing.wait(5)
+        start = time.perf_counter()
+        refresher.ensure_loaded()
+        df, _, _, _ = refresher.current()
+        assert time.perf_counter() - start < 0.5
+        # The rerun reads the data of the last finished sync
+        assert df['a'].tolist() == [1]
+    finally:
+        release.set()
+        refresh.join(5)
+        refresher.stop()
+    assert refresher.current()[0]['a'].tolist() == [2]
+
+
+def test_concurrent_first_loads_sync_once():
+    calls = []
+
+    def sync(on_progress=None):
+        calls.append(None)
+        time.sleep(0.2)
+        return pd.DataFrame({'a': [1]}), {}
+
+    refresher = make_refresher(sync)
+    threads = [threading.Thread(target=refresher.ensure_loaded) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    refresher.stop()
+    assert len(calls) == 1
+    assert refresher.current()[0] is not None
@@ -0,0 +1,32 @@
+from synthetic import generate_items
+from util_functions import SCHEMA, concat_frames, create_dataframe_from_items
+
+# Bytes per progress row of the typed frame, about 100 today. The untyped
+# frame with object strings and Decimals took about 970.
+MAX_BYTES_PER_ROW = 160
+
+
+def synthetic_frame(n_items, seed=0):
+    return create_dataframe_from_items(list(generate_items(n_items, seed=seed)))
+
+
+def assert_schema(df):
+    dtypes = {column: str(dtype) for column, dtype in df.dtypes.items() if column in SCHEMA}
+    assert dtypes == {column: SCHEMA[column] for column in dtypes}
+    assert set(SCHEMA) <= set(df.columns)
+
+
+def test_frame_follows_schema():
+    assert_schema(synthetic_frame(5000))
+
+
+def test_concatenated_frames_keep_schema():
+    # Frames of different pages have different categories
+    df = concat_frames([synthetic_frame(2000, seed=1), synthetic_frame(2000, seed=2)])
+    assert_schema(df)
+
+
+def test_memory_footprint():
+    df = synthetic_frame(20000)
+    bytes_per_row = df.memory_usage(deep=True).sum() / len(df)
+    assert bytes_per_row < MAX_BYTES_PER_ROW
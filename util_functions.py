@@ -1,11 +1,9 @@
 import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 import pandas as pd
-from decimal import Decimal
 import numpy as np
-import base64
-from io import BytesIO
+
+from profiling import timed
 
 
 def get_months_and_years_since(date_str):
@@ -35,92 +33,253 @@ def add_months(date, months):
     return datetime(year, month, day)
 
 
+@timed('build_month_index')
+def build_month_index(df):
+    """
+    Partitions the rows of a DataFrame by (year, month) of 'Terminado' and by 'negocio'.
+
+    The index only stores row positions, so it is cheap to keep next to the DataFrame
+    and turns selecting a month into a dict lookup instead of a scan over the history.
+
+    :param df: DataFrame built by create_dataframe_from_items.
+    :return: A dict {(year, month): {'all': positions, negocio: positions, ...}}.
+    """
+    terminado = df['Terminado']
+    if not pd.api.types.is_datetime64_any_dtype(terminado):
+        terminado = pd.to_datetime(terminado, errors='coerce')
+    period = terminado.dt.year * 100 + terminado.dt.month
+
+    month_index = {}
+    groups = df.groupby([period, df['negocio']], sort=True, dropna=False, observed=True).indices
+    for (key, nego), rows in groups.items():
+        if pd.isna(key):
+            continue
+        entry = month_index.setdefault((int(key) // 100, int(key) % 100), {})
+        entry[nego] = rows
+
+    for entry in month_index.values():
+        entry['all'] = np.sort(np.concatenate(list(entry.values())))
 
+    return month_index
 
-def filter_by_year_month(df, year, month, nego):
-    filtered_items = []
-    for index, row in df.iterrows():
-        close_at_date = row['Terminado']
-        if pd.to_datetime(close_at_date).year == year and pd.to_datetime(close_at_date).month == month and row['negocio']== nego:
-            filtered_items.append(row)
-    return pd.DataFrame(filtered_items)
 
-def filter_by_year_month_only(df, year, month):
+@timed('get_month_splits')
+def get_month_splits(df, month_index, year, month, negocios=('sabimet', 'steelk')):
+    """
+    Selects the rows of a month, and of each business in it, from an index built by build_month_index.
+
+    :param df: The DataFrame the index was built from.
+    :param month_index: The index returned by build_month_index.
+    :param year: The year to select.
+    :param month: The month to select.
+    :param negocios: The businesses to split out.
+    :return: A dict with the whole month under 'all' and one DataFrame per business.
+
+    The positional take already gives new frames, so no extra copy is made. The
+    dashboard runs with pandas copy-on-write, so writing to a split never reaches
+    the shared df.
     """
-    Filters a DataFrame to include only rows where the 'Terminado' column matches
-    the specified year and month.
+    entry = month_index.get((year, month), {})
+    splits = {'all': df.iloc[entry.get('all', [])]}
+    for nego in negocios:
+        splits[nego] = df.iloc[entry.get(nego, [])]
+    return splits
+
+
+
+
+# Declared dtypes of the frame built by create_dataframe_from_items. Low cardinality strings are
+# categoricals, counts are int32 when every value fits, measures that are only displayed are float32.
+# 'espesor' and the derived totals stay float64 because they feed mm and cost sums and the exports.
+SCHEMA = {
+    'pv': 'category',
+    'Inicio': 'datetime64[ns]',
+    'cantidadPerforacionesTotal': 'int32',
+    'Terminado': 'datetime64[ns]',
+    'cantidadPerforacionesPlacas': 'int32',
+    'kg': 'float32',
+    'tipoMecanizado': 'category',
+    'progress_createdAt': 'datetime64[ns]',
+    'origen': 'category',
+    'maquina': 'category',
+    'placas': 'int32',
+    'hora_reporte': 'category',
+    'tiempo': 'float32',
+    'tiempo_seteo': 'float32',
+    'espesor': 'float64',
+    'negocio': 'category',
+    'cliente': 'category',
+    'posicion': 'category',
+    'perforaTotal': 'float64',
+    'Tiempo Proceso (min)': 'float64',
+}
+
+
+def _downcast_integer(series, dtype):
+    # Integer dtypes are only used when no value would change, otherwise the column stays float64
+    values = series.to_numpy(dtype=np.float64)
+    info = np.iinfo(dtype)
+    if len(values) == 0 or (np.isfinite(values).all() and (values == np.round(values)).all()
+                            and values.min() >= info.min and values.max() <= info.max):
+        return series.astype(dtype)
+    return series.astype(np.float64)
+
+
+def apply_schema(df, schema=SCHEMA):
+    """
+    Casts the columns of a DataFrame to the dtypes declared in SCHEMA.
+
+    Parameters:
+    - df (pd.DataFrame): DataFrame built by create_dataframe_from_items.
+    - schema (dict): Column name to dtype.
 
-    :param df: The input DataFrame.
-    :param year: The year to filter by.
-    :param month: The month to filter by.
-    :return: A DataFrame filtered by the specified year and month.
+    Returns:
+    - pd.DataFrame: The same DataFrame with its columns cast.
     """
-    # Ensure 'Terminado' is in datetime format
-    filtered_items = []
-    for index, row in df.iterrows():
-        close_at_date = row['Terminado']
-        if pd.to_datetime(close_at_date).year == year and pd.to_datetime(close_at_date).month == month:
-            filtered_items.append(row)
-    return pd.DataFrame(filtered_items)
+    for col, dtype in schema.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype == 'category':
+            df[col] = df[col].astype('category')
+        elif dtype.startswith('datetime64'):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif dtype.startswith('int'):
+            df[col] = _downcast_integer(pd.to_numeric(df[col], errors='coerce'), dtype)
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+    return df
+
 
+def _repeat_categorical(values, counts):
+    # Encode once per item and repeat the integer codes instead of the strings
+    categorical = pd.Categorical(values)
+    return pd.Categorical.from_codes(np.repeat(categorical.codes, counts), categorical.categories)
 
 
+def _to_float_array(values):
+    # float() per value is an order of magnitude faster than letting NumPy coerce Decimal objects.
+    # DynamoDB NULLs (None) and non-numeric values go through pd.to_numeric and become NaN.
+    try:
+        return np.fromiter(map(float, values), dtype=np.float64, count=len(values))
+    except (TypeError, ValueError):
+        return pd.to_numeric(values, errors='coerce').astype(np.float64)
+
 
 def create_dataframe_from_items(items):
-    columns = [
-        'pv', 'Inicio', 'cantidadPerforacionesTotal', 'Terminado', 'cantidadPerforacionesPlacas', 'kg',
-        'tipoMecanizado', 'progress_createdAt', 'origen', 'maquina', 'placas', 'hora_reporte', 'tiempo',
-        'tiempo_seteo', 'espesor', 'negocio', 'cliente', 'posicion'
-    ]
-
-    rows = []
-
-    for item in items:
-        # Extract the fixed part of the data with renamed columns
-        fixed_values = {
-            'pv': item['pv'],
-            'Inicio': item['data']['createdAt'],
-            'cantidadPerforacionesTotal': item['data']['cantidadPerforacionesTotal'],
-            'Terminado': item['timestamp'],
-            'cantidadPerforacionesPlacas': item['data']['cantidadPerforacionesPlacas'],
-            'kg': item['data']['kg'],
-            'tipoMecanizado': item['data']['tipoMecanizado'],
-            'espesor': item['data'].get('espesor', 0),  # Assuming 'espesor' comes from 'data' dictionary
-            'cliente': item['data']['cliente'],
-            'posicion': item['posicion']
-        }
-
-        # Process each progress element
-        for progress_item in item['data']['progress']:
-            row = {
-                'progress_createdAt': progress_item.get('createdAt', '0'),
-                'origen': progress_item.get('origen', '0'),
-                'maquina': progress_item.get('maquina', '0'),
-                'placas': float(progress_item.get('placas', 0)) if 'placas' in progress_item else 0,
-                'hora_reporte': progress_item.get('hora_reporte', '0'),
-                'negocio': item['data'].get('negocio', 'does not exist'),
-                'tiempo': float(progress_item.get('tiempo', 0)) if 'tiempo' in progress_item else 0,
-                'tiempo_seteo': float(progress_item.get('tiempo_seteo', 0)) if 'tiempo_seteo' in progress_item else 0
-            }
-
-            # Combine fixed values with progress item specific values
-            combined_row = {**fixed_values, **row}
-            rows.append(combined_row)
-
-    # Create DataFrame from rows
-    df = pd.DataFrame(rows, columns=columns)
-    df['Inicio'] = pd.to_datetime(df['Inicio'], errors='coerce')
-    df['Terminado'] = pd.to_datetime(df['Terminado'], errors='coerce')
-    columns_to_convert = ['placas', 'cantidadPerforacionesPlacas']
-    for col in columns_to_convert:
-        df[col] = df[col].apply(lambda x: float(x) if isinstance(x, Decimal) else x)
+    """
+    Flattens the DynamoDB items into one row per progress entry.
 
+    Item level values are collected once per item and repeated for each of its
+    progress entries; progress level values are written into preallocated arrays.
+    Decimal values are converted to float in bulk per column and the result is
+    cast to SCHEMA.
+
+    Parameters:
+    - items (list): Items from the MecanizadoClose table.
+
+    Returns:
+    - pd.DataFrame: One row per progress entry, plus 'perforaTotal' and 'Tiempo Proceso (min)'.
+    """
+    n_items = len(items)
+    counts = np.fromiter((len(item['data']['progress']) for item in items), dtype=np.int64, count=n_items)
+    n_rows = int(counts.sum())
+
+    # Item level columns, one value per item
+    pv = np.empty(n_items, dtype=object)
+    inicio = np.empty(n_items, dtype=object)
+    perforaciones_total = np.empty(n_items, dtype=object)
+    terminado = np.empty(n_items, dtype=object)
+    perforaciones_placas = np.empty(n_items, dtype=object)
+    kg = np.empty(n_items, dtype=object)
+    tipo_mecanizado = np.empty(n_items, dtype=object)
+    espesor = np.empty(n_items, dtype=object)
+    negocio = np.empty(n_items, dtype=object)
+    cliente = np.empty(n_items, dtype=object)
+    posicion = np.empty(n_items, dtype=object)
+
+    # Progress level columns, one value per progress entry
+    progress_created_at = np.empty(n_rows, dtype=object)
+    origen = np.empty(n_rows, dtype=object)
+    maquina = np.empty(n_rows, dtype=object)
+    placas = np.empty(n_rows, dtype=object)
+    hora_reporte = np.empty(n_rows, dtype=object)
+    tiempo = np.empty(n_rows, dtype=object)
+    tiempo_seteo = np.empty(n_rows, dtype=object)
+
+    row = 0
+    for i, item in enumerate(items):
+        data = item['data']
+        pv[i] = item['pv']
+        inicio[i] = data['createdAt']
+        perforaciones_total[i] = data['cantidadPerforacionesTotal']
+        terminado[i] = item['timestamp']
+        perforaciones_placas[i] = data['cantidadPerforacionesPlacas']
+        kg[i] = data['kg']
+        tipo_mecanizado[i] = data['tipoMecanizado']
+        espesor[i] = data.get('espesor', 0)
+        negocio[i] = data.get('negocio', 'does not exist')
+        cliente[i] = data['cliente']
+        posicion[i] = item['posicion']
+
+        for progress_item in data['progress']:
+            get = progress_item.get
+            progress_created_at[row] = get('createdAt', '0')
+            origen[row] = get('origen', '0')
+            maquina[row] = get('maquina', '0')
+            placas[row] = get('placas', 0)
+            hora_reporte[row] = get('hora_reporte', '0')
+            tiempo[row] = get('tiempo', 0)
+            tiempo_seteo[row] = get('tiempo_seteo', 0)
+            row += 1
+
+    inicio = pd.to_datetime(inicio, errors='coerce')
+    terminado = pd.to_datetime(terminado, errors='coerce')
+    tiempo_proceso = np.round((terminado - inicio).total_seconds().to_numpy() / 60, 2)
+
+    frame = {
+        'pv': np.repeat(pv, counts),
+        'Inicio': inicio.repeat(counts).array,
+        'cantidadPerforacionesTotal': np.repeat(_to_float_array(perforaciones_total), counts),
+        'Terminado': terminado.repeat(counts).array,
+        'cantidadPerforacionesPlacas': np.repeat(_to_float_array(perforaciones_placas), counts),
+        'kg': np.repeat(_to_float_array(kg), counts),
+        'tipoMecanizado': _repeat_categorical(tipo_mecanizado, counts),
+        'progress_createdAt': progress_created_at,
+        'origen': pd.Categorical(origen),
+        'maquina': pd.Categorical(maquina),
+        'placas': _to_float_array(placas),
+        'hora_reporte': hora_reporte,
+        'tiempo': _to_float_array(tiempo),
+        'tiempo_seteo': _to_float_array(tiempo_seteo),
+        'espesor': np.repeat(_to_float_array(espesor), counts),
+        'negocio': _repeat_categorical(negocio, counts),
+        'cliente': np.repeat(cliente, counts),
+        'posicion': np.repeat(posicion, counts),
+    }
+
+    # Create DataFrame from the column arrays
+    df = pd.DataFrame(frame)
     df['perforaTotal'] = df['placas']*df['cantidadPerforacionesPlacas']
-    df['Tiempo Proceso (min)'] = round((df['Terminado'] - df['Inicio']).dt.total_seconds() / 60, 2)
+    df['Tiempo Proceso (min)'] = np.repeat(tiempo_proceso, counts)
+
+    return apply_schema(df)
 
-    return df
 
+def concat_frames(frames):
+    """
+    Concatenates frames built by create_dataframe_from_items.
+
+    pd.concat falls back to object when the categorical columns of the frames have
+    different categories, so the schema is applied again after concatenating.
 
+    Parameters:
+    - frames (list): DataFrames with the same columns.
+
+    Returns:
+    - pd.DataFrame: The concatenated DataFrame with a fresh RangeIndex.
+    """
+    df = pd.concat(frames, ignore_index=True)
+    return apply_schema(df)
 
 
 def filter_and_drop_columns(df, filter_column, filter_value, columns_to_drop):
@@ -157,76 +316,47 @@ def group_and_average(df, group_columns, avg_column):
     - pd.DataFrame: A DataFrame with the grouped columns and the average values.
     """
     # Group the DataFrame by the specified columns and compute the mean of the avg_column
-    grouped_df = df.groupby(group_columns, as_index=False)[avg_column].mean()
+    grouped_df = df.groupby(group_columns, as_index=False, observed=True)[avg_column].mean()
     grouped_df[avg_column] = grouped_df[avg_column].round(2)
     return grouped_df
 
-precio = {'sabimet': 226, 'steelk': 108}
-
-
-def calculate_price(row):
-    return row['mm de perforado'] * precio.get(row['negocio'], 1)
-
-
-def group_and_sum_without_remove_columns(df, group_columns, avg_columns,
-                                       cols_to_convert=['cantidadPerforacionesPlacas', 'kg', 'placas', 'espesor',
-                                                      'perforaTotal']):
-    # Convert specified columns to numeric
-    df[cols_to_convert] = df[cols_to_convert].apply(pd.to_numeric, errors='ignore')
-
-    # If avg_columns is a single string, convert it to a list
-    if isinstance(avg_columns, str):
-        avg_columns = [avg_columns]
-
-    # Create aggregation dictionary
-    # All columns get 'first' by default
-    agg_dict = {col: 'first' for col in df.columns}
-
-    # Override with 'sum' for the specified columns to aggregate
-    for col in avg_columns:
-        agg_dict[col] = 'sum'
-
-    # Perform groupby and aggregation
-    grouped_df = df.groupby(group_columns, as_index=False).agg(agg_dict)
-
-    # Round the summed columns
-    for col in avg_columns:
-        grouped_df[col] = grouped_df[col].round(2)
-
-    # Calculate additional columns
-    grouped_df['mm de perforado'] = grouped_df['perforaTotal'] * grouped_df['espesor']
-    grouped_df['costo'] = grouped_df.apply(calculate_price, axis=1)
-
-    return grouped_df.reset_index(drop=True)
-
-def group_and_sum_without_remove_columns2(df, group_columns, avg_columns,
-                                       cols_to_convert=['cantidadPerforacionesPlacas', 'kg', 'placas', 'espesor',
-                                                      'perforaTotal']):
-    # Convert specified columns to numeric
-    df[cols_to_convert] = df[cols_to_convert].apply(pd.to_numeric, errors='ignore')
-
-    # If avg_columns is a single string, convert it to a list
-    if isinstance(avg_columns, str):
-        avg_columns = [avg_columns]
+@timed('aggregate_with_attributes')
+def aggregate_with_attributes(df, group_columns, sum_columns, attribute_columns=()):
+    """
+    Sums the given columns per group and carries descriptive attributes through.
 
-    # Create aggregation dictionary
-    # All columns get 'first' by default
-    agg_dict = {col: 'first' for col in df.columns}
+    Only sum_columns are aggregated; attribute_columns come from a dimension table
+    holding the first row of each group. The sums are joined to it on the group
+    number that the same groupby assigns to every row (ngroup), so each group gets
+    its own sums whatever order either side is in, without hashing the categorical
+    keys again. The frame already has the dtypes from SCHEMA, so no numeric
+    coercion is done here.
 
-    # Override with 'sum' for the specified columns to aggregate
-    for col in avg_columns:
-        agg_dict[col] = 'sum'
+    Parameters:
+    - df (pd.DataFrame): Input DataFrame.
+    - group_columns (list): Columns to group by.
+    - sum_columns (list): Columns to sum, rounded to 2 decimals.
+    - attribute_columns (list): Columns taken from the first row of each group.
 
-    # Perform groupby and aggregation
-    grouped_df = df.groupby(group_columns, as_index=False).agg(agg_dict)
+    Returns:
+    - pd.DataFrame: One row per group, columns in the order they have in df.
+    """
+    group_columns = list(group_columns)
+    grouper = df.groupby(group_columns, observed=True)
+    sums = grouper[list(sum_columns)].sum().round(2)
 
-    # Round the summed columns
-    for col in avg_columns:
-        grouped_df[col] = grouped_df[col].round(2)
+    # Group number of every row (NaN for rows with a missing key) and the first row of each group
+    group_ids, first_rows = np.unique(grouper.ngroup().to_numpy(), return_index=True)
+    keyed = group_ids >= 0
+    group_ids, first_rows = group_ids[keyed].astype(np.int64), first_rows[keyed]
 
-    return grouped_df.reset_index(drop=True)
+    grouped_df = df[group_columns + list(attribute_columns)].take(first_rows).reset_index(drop=True)
+    for col in sum_columns:
+        grouped_df[col] = sums[col].to_numpy()[group_ids]
+    return grouped_df[[col for col in df.columns if col in grouped_df.columns]]
 
 
+@timed('group_and_sum')
 def group_and_sum(df, group_columns, avg_column):
     """
     Groups a DataFrame by specified columns and computes the average of another column.
@@ -240,10 +370,11 @@ def group_and_sum(df, group_columns, avg_column):
     - pd.DataFrame: A DataFrame with the grouped columns and the average values.
     """
     # Group the DataFrame by the specified columns and compute the mean of the avg_column
-    grouped_df = df.groupby(group_columns, as_index=False)[avg_column].sum()
+    grouped_df = df.groupby(group_columns, as_index=False, observed=True)[avg_column].sum()
     grouped_df[avg_column] = grouped_df[avg_column].round(2)
     return grouped_df
 
+@timed('group_and_avg')
 def group_and_avg(df, group_columns, avg_column):
     """
     Groups a DataFrame by specified columns and computes the average of another column.
@@ -257,7 +388,7 @@ def group_and_avg(df, group_columns, avg_column):
     - pd.DataFrame: A DataFrame with the grouped columns and the average values.
     """
     # Group the DataFrame by the specified columns and compute the mean of the avg_column
-    grouped_df = df.groupby(group_columns, as_index=False)[avg_column].mean()
+    grouped_df = df.groupby(group_columns, as_index=False, observed=True)[avg_column].mean()
     grouped_df[avg_column] = grouped_df[avg_column].round(2)
     return grouped_df
 
@@ -266,7 +397,7 @@ def group_and_avg(df, group_columns, avg_column):
 # Define the sunburst function to create a sunburst plot
 def sunburst_plot(df: pd.DataFrame, options: list, name: str, suma: str):
     # Group by the hierarchical structure and compute the mean of 'kg'
-    grouped_df = df.groupby(options)[suma].mean().reset_index()
+    grouped_df = df.groupby(options, observed=True)[suma].mean().reset_index()
 
     # Add a root column for the sunburst plot
     grouped_df['root'] = name
@@ -293,80 +424,21 @@ def sunburst_plot(df: pd.DataFrame, options: list, name: str, suma: str):
     return fig
 
 
-def bar_plot_with_hover_info(df: pd.DataFrame):
-    fig = go.Figure()
-
-    # Create bar chart
-    fig.add_trace(go.Bar(
-        x=df['pv'],
-        y=df['placas'],
-        text=df['espesor'],  # Add espesor as text annotations
-        textposition='outside',  # Position text annotations
-        marker=dict(color='LightSkyBlue'),
-        hovertemplate=(
-            '<b>PV:</b> %{x}<br>'
-            '<b>Placas:</b> %{y}<br>'
-            '<b>Espesor:</b> %{text}'
-        )
-    ))
-
-    # Update layout
-    fig.update_layout(
-
-        # title='Bar Plot of PV vs. Placas with Espesor Annotations',
-        xaxis_title='PV',
-        yaxis_title='Placas',
-        xaxis=dict(type='category'),
-        yaxis=dict(showgrid=True),
-        showlegend=False
-    )
-
-    # Adjust font size for annotations
-    fig.update_traces(textfont_size=12)
-
-    return fig
-
-
-
-def bar_plot_with_hover_process(df: pd.DataFrame):
-    # Calculate the average time
-    average_time = df['Tiempo_Proceso_Dias'].mean()
-
-    # Create bar chart
-    fig = go.Figure()
-
-    # Adding bars with correct text annotations
-    fig.add_trace(go.Bar(
-        x=df['pv'],
-        y=df['Tiempo_Proceso_Dias'],
-        # text=df['Tiempo Proceso (Dias)'],  # Ensure this is straight from the df
-        textposition='outside',
-        marker=dict(color='LightSkyBlue'),
-        hovertemplate='<b>PV:</b> %{x}<br><b>Tiempo:</b> %{y}<extra></extra>'
-    ))
+def comparison_bar_plot(df: pd.DataFrame, value: str, color: str, title: str):
+    # One group of bars per period, one bar per machine or business
+    fig = px.bar(df, x='periodo', y=value, color=color, barmode='group', title=title,
+                 color_discrete_sequence=px.colors.qualitative.G10)
 
-    # Add horizontal line for average time
-    fig.add_hline(y=average_time, line_dash="dashdot", line_color="red",
-                  annotation_text=f"Average: {average_time:.2f}", annotation_position="bottom right")
-
-    # Update layout
     fig.update_layout(
-        title="Dias/Pv en Proceso",
-        xaxis_title='PV',
-        yaxis_title='Tiempo Proceso (Dias)',
-        showlegend=False,
+        xaxis_title='Periodo',
+        yaxis_title=value,
         xaxis=dict(type='category'),
         yaxis=dict(showgrid=True),
-        template='plotly_white'  # Setting a clean theme for clear visualization
     )
 
     return fig
 
 
-
-
-
-
 def filter_rows_by_column_value(df, column_name, value_to_kepp, reset_index=True):
     """
     Filters rows from a DataFrame based on a specific column value and optionally resets the index.
@@ -422,9 +494,10 @@ def expand_datetime_column(df, column_name):
 
 
 
+@timed('calculate_max_average')
 def calculate_max_average(df):
     # Group by 'tipoMecanizado', 'maquina', and 'espesor'
-    grouped_df = df.groupby(['tipoMecanizado', 'maquina', 'espesor'])
+    grouped_df = df.groupby(['tipoMecanizado', 'maquina', 'espesor'], observed=True)
 
     # Aggregate to find max and average of 'perforaTotal'
     result_df = grouped_df['perforaTotal'].agg(['max', 'mean']).reset_index()
@@ -440,70 +513,33 @@ def calculate_max_average(df):
 
 
 
+@timed('create_perfora_grid')
 def create_perfora_grid(df):
     """
-    Creates a grid DataFrame with tipoMecanizado as columns and
-    combination of espesor and maquina as rows. Each cell displays
-    (maxPerfora, avgPerfora).
+    Creates a numeric grid with tipoMecanizado as columns and the combination
+    of espesor and maquina as rows.
     Args:
         df (pd.DataFrame): DataFrame containing the columns 'tipoMecanizado',
         'maquina', 'espesor', 'maxPerfora', 'avgPerfora'.
     Returns:
-        pd.DataFrame: Pivot table with the grid layout.
+        pd.DataFrame: Grid with 'maxPerfora' and 'avgPerfora' as the top column level;
+        see format_perfora_grid for the (max, avg) text shown in the dashboard.
     """
-    # Sort the DataFrame by 'espesor', then by 'maquina'
-    df_sorted = df.sort_values(by=['espesor', 'maquina'])
+    # Plain object keys so only observed tipoMecanizado values become columns
+    keys = df[['espesor', 'maquina', 'tipoMecanizado']].astype(object)
+    grid = (df[['maxPerfora', 'avgPerfora']]
+            .set_index([keys['espesor'], keys['maquina'], keys['tipoMecanizado']])
+            .unstack('tipoMecanizado')
+            .sort_index())
+    return grid
 
-    # Create a combined string column for maxPerfora and avgPerfora in the format (max, avg)
-    df_sorted['combined'] = df_sorted.apply(lambda x: f"({x['maxPerfora']},{x['avgPerfora']})", axis=1)
 
-    # Create multi-index for rows with espesor and maquina
-    df_sorted['row_index'] = list(zip(df_sorted['espesor'], df_sorted['maquina']))
-
-    # Create a pivot table with combined values
-    pivot_table = df_sorted.pivot_table(index='row_index', columns='tipoMecanizado', values='combined', aggfunc='first')
-
-    # Reformatting index for a cleaner display
-    pivot_table.index = pd.MultiIndex.from_tuples(pivot_table.index, names=['espesor', 'maquina'])
-
-    return pivot_table
-
-# --- Function definitions outside the expander ---
-def highlight_na_and_conditions(val):
-    try:
-        if pd.isna(val):
-            return 'background-color: lightcoral; color: black; text-align: center;'
-        else:
-            max_perfora = float(val)
-            if max_perfora > 100:
-                return 'background-color: lightgreen; color: black; text-align: center;'
-    except:
-        pass
-    return 'color: black; text-align: center;'
-
-def highlight_espesor_change(df):
-    espesor = df.index.get_level_values('espesor')
-    bg_colors = pd.DataFrame('', index=df.index, columns=df.columns)
-    color_switch = 'lightgrey'
-    for i in range(len(espesor)):
-        if i == 0 or espesor[i] != espesor[i - 1]:
-            color_switch = 'white' if color_switch == 'lightgrey' else 'lightgrey'
-        bg_colors.iloc[i] = f'background-color: {color_switch}; color: black; text-align: center;'
-    return bg_colors
-
-
-
-def get_table_download_link(df, year, month, name):
-    """Generates a link allowing the data in a given pandas dataframe to be downloaded
-    in: dataframe
-    out: href string
+def format_perfora_grid(grid):
     """
-    towrite = BytesIO()
-    df.to_excel(towrite, index=False, sheet_name='Sheet1')  # write to BytesIO object
-    towrite.seek(0)  # go to the start of the BytesIO object
-    b64 = base64.b64encode(towrite.read()).decode()  # encode to base64 (strings <-> bytes conversions)
-    filename = f"cnc_{name}_{year}_{month}.xlsx"
-
-    # return as button instead of link
-    return f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="{filename}"><button style="color: black; background-color: #ff6347; border: none; border-radius: 15px; padding: 10px 20px;"> Descargar - {name} - {year} - {month}</button></a>'
-
+    Turns the numeric grid from create_perfora_grid into '(max,avg)' text cells,
+    leaving NaN where a combination has no data.
+    """
+    max_grid = grid['maxPerfora']
+    cells = ('(' + max_grid.astype('Int64').astype(str) + ','
+             + grid['avgPerfora'].astype('Int64').astype(str) + ')')
+    return cells.where(max_grid.notna())